@@ -0,0 +1,73 @@
+"""
+Benchmark : temps d'encodage et taille de fichier par profil de compression
+(fast / balanced / smallest) pour PNG, WEBP lossy, WEBP lossless et JPEG.
+
+Usage:
+    python benchmarks/bench_compression_profiles.py [--size 1024] [--count 4] [--quality 95]
+
+Utilise directement nodes/image/encoder_profiles.py (pas besoin de ComfyUI).
+L'image de test est synthétique (dégradés + formes + léger bruit) pour se
+rapprocher d'un rendu plutôt que d'un bruit pur, incompressible.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes", "image"))
+from encoder_profiles import PROFILE_NAMES, encoder_kwargs  # noqa: E402
+
+
+def _test_image(size, seed):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    base = np.stack([x, y, (x + y) / 2], axis=-1) * 255
+    img = Image.fromarray(base.astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.integers(0, size, 2)
+        r = int(rng.integers(size // 40, size // 6))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        draw.ellipse([x0 - r, y0 - r, x0 + r, y0 + r], fill=color)
+    noisy = np.asarray(img).astype(np.int16) + rng.integers(-6, 7, (size, size, 3))
+    return Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=1024, help="côté des images (px)")
+    parser.add_argument("--count", type=int, default=4, help="nombre d'images par mesure")
+    parser.add_argument("--quality", type=int, default=95)
+    opts = parser.parse_args()
+
+    images = [_test_image(opts.size, seed) for seed in range(opts.count)]
+    cases = [("png", "png", False), ("webp", "webp", False),
+             ("webp lossless", "webp", True), ("jpeg", "jpeg", False)]
+
+    print(f"{opts.count} images {opts.size}x{opts.size}, quality {opts.quality}\n")
+    print(f"{'format':<15}{'profil':<10}{'ms/image':>10}{'KB/image':>10}{'vitesse vs balanced':>22}")
+    for label, fmt, lossless in cases:
+        timings = {}
+        for profile in PROFILE_NAMES:
+            kwargs = encoder_kwargs(fmt, profile, opts.quality, lossless=lossless)
+            total_time = 0.0
+            total_size = 0
+            for img in images:
+                buf = io.BytesIO()
+                t0 = time.perf_counter()
+                img.save(buf, format=fmt.upper(), **kwargs)
+                total_time += time.perf_counter() - t0
+                total_size += buf.tell()
+            timings[profile] = (total_time / opts.count, total_size / opts.count)
+        for profile, (t, size) in timings.items():
+            speedup = timings["balanced"][0] / t if t else float("inf")
+            print(f"{label:<15}{profile:<10}{t * 1000:>10.1f}{size / 1024:>10.0f}{speedup:>21.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
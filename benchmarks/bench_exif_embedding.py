@@ -0,0 +1,115 @@
+"""
+Benchmark : écriture EXIF en deux passes (save + piexif.insert) vs une passe (save(exif=...)).
+Mesure le temps et les octets écrits par image, pour WEBP et JPEG.
+
+Usage:
+    python benchmarks/bench_exif_embedding.py [--size 1024] [--count 8] [--workflow-kb 40]
+
+Ne dépend que de Pillow, numpy et piexif (pas besoin de ComfyUI).
+Les octets écrits viennent de /proc/self/io (wchar) quand il est disponible,
+sinon ils sont déduits de la taille des fichiers.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+import numpy as np
+import piexif
+import piexif.helper
+from PIL import Image
+
+
+def _proc_wchar():
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _fake_workflow(target_kb):
+    nodes = []
+    size = 0
+    i = 0
+    while size < target_kb * 1024:
+        text = "".join(random.choices(string.ascii_letters + " ", k=200))
+        nodes.append({"id": i, "type": "CLIPTextEncode", "widgets_values": [text]})
+        size += 260
+        i += 1
+    return {"nodes": nodes}
+
+
+def _build_exif(workflow, a111_params):
+    return piexif.dump({
+        "0th": {piexif.ImageIFD.Make: "workflow:" + json.dumps(workflow, separators=(',', ':'))},
+        "Exif": {piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(a111_params, encoding="unicode")},
+    })
+
+
+def save_two_pass(img, path, fmt, exif_bytes):
+    if fmt == "webp":
+        img.save(path, quality=97, method=6)
+    else:
+        img.save(path, quality=97)
+    piexif.insert(exif_bytes, path)
+    return 2  # le fichier est écrit deux fois
+
+
+def save_single_pass(img, path, fmt, exif_bytes):
+    if fmt == "webp":
+        img.save(path, quality=97, method=6, exif=exif_bytes)
+    else:
+        img.save(path, quality=97, exif=exif_bytes)
+    return 1
+
+
+def run(strategy, images, fmt, exif_bytes, out_dir):
+    times = []
+    written = []
+    for n, img in enumerate(images):
+        path = os.path.join(out_dir, f"{strategy.__name__}_{n}.{fmt}")
+        w0 = _proc_wchar()
+        t0 = time.perf_counter()
+        passes = strategy(img, path, fmt, exif_bytes)
+        times.append(time.perf_counter() - t0)
+        w1 = _proc_wchar()
+        if w0 is not None and w1 is not None:
+            written.append(w1 - w0)
+        else:
+            written.append(os.path.getsize(path) * passes)
+    return sum(times) / len(times), sum(written) / len(written), os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=1024, help="côté des images (px)")
+    parser.add_argument("--count", type=int, default=8, help="nombre d'images par format")
+    parser.add_argument("--workflow-kb", type=int, default=40,
+                        help="taille du workflow JSON (JPEG limité à 64 KB d'EXIF)")
+    opts = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 256, (opts.size, opts.size, 3), dtype=np.uint8))
+              for _ in range(opts.count)]
+    a111 = "a cat\nNegative prompt: blurry\nSteps: 30, Sampler: euler normal, CFG scale: 7, Seed: 1"
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        for fmt in ("webp", "jpg"):
+            workflow_kb = opts.workflow_kb if fmt == "webp" else min(opts.workflow_kb, 40)
+            exif_bytes = _build_exif(_fake_workflow(workflow_kb), a111)
+            print(f"\n{fmt.upper()} {opts.size}x{opts.size}, EXIF {len(exif_bytes) / 1024:.0f} KB, {opts.count} images")
+            print(f"{'stratégie':<18}{'ms/image':>10}{'KB écrits/image':>18}{'taille fichier KB':>20}")
+            for strategy in (save_two_pass, save_single_pass):
+                t, w, size = run(strategy, images, fmt, exif_bytes, out_dir)
+                print(f"{strategy.__name__:<18}{t * 1000:>10.1f}{w / 1024:>18.0f}{size / 1024:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cache LRU des images décodées pour les loaders TOO-Pack
+(SmartImageLoader, TOOSimpleImageLoader, TOOCropImage).
+Quand ComfyUI ré-exécute un loader (réglage d'un node en aval), le même
+fichier était redécodé et reconverti à chaque run. On garde les pixels
+décodés en uint8 (4x plus petit que le float32 ComfyUI) :
+- clé : (chemin absolu, taille, mtime_ns) -> un fichier modifié est relu
+- budget mémoire en octets, éviction des entrées les moins récemment utilisées
+- tableaux en lecture seule : chaque run construit son propre tensor
+Budget : variable d'environnement TOO_IMAGE_CACHE_MB (défaut 512, 0 = désactivé).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = 512
+
+
+class DecodedImageCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> np.ndarray uint8
+        self._by_path = {}  # chemin -> key courante (une seule version par fichier)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(filepath, st=None):
+        """(chemin absolu, taille, mtime_ns) ; st = os.stat/os.fstat déjà fait"""
+        if st is None:
+            st = os.stat(filepath)
+        return (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+
+    def get(self, key):
+        with self._lock:
+            pixels = self._entries.get(key)
+            if pixels is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pixels
+
+    def _drop(self, key):
+        pixels = self._entries.pop(key)
+        self.bytes -= pixels.nbytes
+        if self._by_path.get(key[0]) == key:
+            del self._by_path[key[0]]
+
+    def put(self, key, pixels):
+        if pixels.nbytes > self.max_bytes:
+            return
+        pixels.setflags(write=False)
+        with self._lock:
+            # Ancienne version du même fichier (taille/mtime différents)
+            previous = self._by_path.get(key[0])
+            if previous is not None and previous in self._entries:
+                self._drop(previous)
+            while self._entries and self.bytes + pixels.nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = pixels
+            self._by_path[key[0]] = key
+            self.bytes += pixels.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_path.clear()
+            self.bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Cache partagé, ou None si désactivé (TOO_IMAGE_CACHE_MB=0)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                budget_mb = float(os.environ.get("TOO_IMAGE_CACHE_MB", DEFAULT_BUDGET_MB))
+            except ValueError:
+                budget_mb = DEFAULT_BUDGET_MB
+            _cache = DecodedImageCache(int(max(budget_mb, 0) * 1024 * 1024))
+        return _cache if _cache.max_bytes > 0 else None
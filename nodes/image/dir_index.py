@@ -0,0 +1,117 @@
+"""
+Index des images d'un dossier pour SmartImageLoader (img_directory).
+La liste des candidats est construite une fois avec os.scandir (le type
+d'entrée vient de readdir, pas d'un stat par fichier), puis mise en cache par
+(dossier, profondeur, extensions) et partagée entre toutes les instances du
+node. Elle est reconstruite quand le mtime d'un des dossiers parcourus change
+(ajout/suppression/renommage de fichier) ou sur demande (refresh).
+L'ordre des fichiers est celui de l'ancien parcours (os.walk / os.listdir),
+donc un même seed tire toujours la même image.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_cache = {}
+# Nombre max de listes gardées en mémoire (une par combinaison dossier/profondeur/extensions)
+_MAX_ENTRIES = 32
+
+
+def _scandir(directory):
+    try:
+        with os.scandir(directory) as it:
+            return list(it)
+    except OSError as e:
+        print(f"SmartImageLoader: Error scanning '{directory}': {e}")
+        return None
+
+
+def _mtime_ns(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan_all(directory, extensions, files, dir_mtimes):
+    """Profondeur -1 : même ordre qu'os.walk (fichiers du dossier, puis sous-dossiers)"""
+    dir_mtimes[directory] = _mtime_ns(directory)
+    entries = _scandir(directory)
+    if entries is None:
+        return
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # os.walk ne suit pas les liens symboliques vers des dossiers
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+        elif entry.name.lower().endswith(extensions):
+            files.append(entry.path)
+    for subdir in subdirs:
+        _scan_all(subdir, extensions, files, dir_mtimes)
+
+
+def _scan_depth(directory, max_depth, current_depth, extensions, files, dir_mtimes):
+    """Profondeur 0..N : même ordre que l'ancien parcours récursif (sous-dossiers visités en place)"""
+    dir_mtimes[directory] = _mtime_ns(directory)
+    entries = _scandir(directory)
+    if entries is None:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file():
+                if entry.name.lower().endswith(extensions):
+                    files.append(entry.path)
+            elif entry.is_dir() and current_depth < max_depth:
+                _scan_depth(entry.path, max_depth, current_depth + 1, extensions, files, dir_mtimes)
+        except OSError:
+            continue
+
+
+def _is_stale(dir_mtimes):
+    return any(_mtime_ns(directory) != mtime_ns for directory, mtime_ns in dir_mtimes.items())
+
+
+def list_images(directory, depth, extensions):
+    """
+    Liste (en cache) des images de directory.
+    depth : -1 = tous les sous-dossiers, 0 = dossier courant, N = N niveaux
+    """
+    extensions = tuple(sorted(e.lower() for e in extensions))
+    key = (os.path.realpath(directory), depth, extensions)
+
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None and not _is_stale(cached[1]):
+        return cached[0]
+
+    files, dir_mtimes = [], {}
+    if depth == -1:
+        _scan_all(directory, extensions, files, dir_mtimes)
+    else:
+        _scan_depth(directory, max(depth, 0), 0, extensions, files, dir_mtimes)
+
+    with _lock:
+        _cache.pop(key, None)
+        _cache[key] = (files, dir_mtimes)
+        while len(_cache) > _MAX_ENTRIES:
+            _cache.pop(next(iter(_cache)))
+    return files
+
+
+def refresh(directory=None):
+    """Oublie l'index d'un dossier (ou de tous) : le prochain appel rescanne"""
+    with _lock:
+        if directory is None:
+            count = len(_cache)
+            _cache.clear()
+            return count
+        realpath = os.path.realpath(directory)
+        keys = [k for k in _cache if k[0] == realpath]
+        for k in keys:
+            del _cache[k]
+        return len(keys)
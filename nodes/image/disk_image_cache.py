@@ -0,0 +1,161 @@
+"""
+Cache disque optionnel des images décodées (pixels uint8 en .npy).
+Pour les grandes images de référence rechargées d'un run à l'autre (et d'un
+redémarrage de ComfyUI à l'autre), le décodage PNG domine : le .npy est relu
+par np.load(mmap_mode="r"), sans décodage, et le tensor est construit
+directement depuis la projection mémoire.
+- index.json : {chemin source: {size, mtime_ns, file, bytes, last_used}}
+  -> une source modifiée (taille/mtime) n'est plus servie et son .npy est supprimé
+- budget disque total, éviction des entrées les moins récemment utilisées
+- seules les images d'au moins MIN_PIXELS passent par le disque (les petites
+  se décodent plus vite qu'elles ne se relisent)
+Activation : TOO_IMAGE_DISK_CACHE_MB (défaut 0 = désactivé),
+dossier : TOO_IMAGE_DISK_CACHE_DIR (défaut user/too_image_cache).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import folder_paths
+
+INDEX_FILENAME = "index.json"
+MIN_PIXELS = 2048 * 2048
+
+
+class DiskImageCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f).get("files", {})
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ TOO-Pack: Index du cache d'images illisible, reconstruit ({e})")
+                self._entries = {}
+            self._remove_orphans()
+        return self._entries
+
+    def _save(self):
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "files": self._entries}, f, indent=1)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"⚠️ TOO-Pack: Impossible de sauvegarder l'index du cache d'images: {e}")
+
+    def _remove_file(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass  # déjà supprimé, ou encore projeté en mémoire (Windows) : nettoyé au prochain démarrage
+
+    def _remove_orphans(self):
+        """.npy absents de l'index (écriture interrompue, suppression impossible)"""
+        known = {entry.get("file") for entry in self._entries.values()}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith((".npy", ".npy.tmp")) and name not in known:
+                self._remove_file(name)
+
+    def _drop(self, source):
+        entry = self._entries.pop(source, None)
+        if entry:
+            self._remove_file(entry.get("file", ""))
+
+    def get(self, key):
+        """np.memmap uint8 en lecture seule pour (chemin, taille, mtime_ns), ou None"""
+        source, size, mtime_ns = key
+        with self._lock:
+            entry = self._load().get(source)
+            if not entry:
+                return None
+            if entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+                # Source modifiée : l'ancien décodage ne vaut plus rien
+                self._drop(source)
+                self._save()
+                return None
+            entry["last_used"] = time.time()  # persisté à la prochaine écriture de l'index
+            name = entry.get("file", "")
+        try:
+            return np.load(os.path.join(self.directory, name), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ TOO-Pack: Cache d'image illisible pour '{source}', ignoré ({e})")
+            with self._lock:
+                self._drop(source)
+                self._save()
+            return None
+
+    def put(self, key, pixels):
+        if pixels.shape[0] * pixels.shape[1] < MIN_PIXELS or pixels.nbytes > self.max_bytes:
+            return
+        source, size, mtime_ns = key
+        with self._lock:
+            self._load()  # nettoyage des orphelins fait avant d'écrire le nouveau .npy
+        # Nom propre à cette version de la source : jamais réécrit pendant qu'il est projeté
+        name = hashlib.blake2b(f"{source}|{size}|{mtime_ns}".encode("utf-8"), digest_size=16).hexdigest() + ".npy"
+        path = os.path.join(self.directory, name)
+        tmp = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(pixels))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ TOO-Pack: Impossible d'écrire le cache d'image: {e}")
+            self._remove_file(name + ".tmp")
+            return
+
+        with self._lock:
+            entries = self._load()
+            if source in entries and entries[source].get("file") != name:
+                self._drop(source)
+            entries[source] = {
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "file": name,
+                "bytes": os.path.getsize(path),
+                "last_used": time.time(),
+            }
+            total = sum(entry.get("bytes", 0) for entry in entries.values())
+            for old in sorted(entries, key=lambda s: entries[s].get("last_used", 0)):
+                if total <= self.max_bytes:
+                    break
+                if old != source:
+                    total -= entries[old].get("bytes", 0)
+                    self._drop(old)
+            self._save()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Cache disque partagé, ou None s'il n'est pas activé (TOO_IMAGE_DISK_CACHE_MB)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                budget_mb = float(os.environ.get("TOO_IMAGE_DISK_CACHE_MB", 0))
+            except ValueError:
+                budget_mb = 0
+            directory = os.environ.get("TOO_IMAGE_DISK_CACHE_DIR") or os.path.join(
+                folder_paths.get_user_directory(), "too_image_cache")
+            _cache = DiskImageCache(directory, int(max(budget_mb, 0) * 1024 * 1024))
+        return _cache if _cache.max_bytes > 0 else None
@@ -0,0 +1,61 @@
+"""
+Profils d'encodage vitesse/taille des savers TOO-Pack.
+- fast     : aperçus en masse, encodage ~5x plus rapide, fichiers plus gros
+- balanced : réglages historiques des savers (défaut)
+- smallest : fichiers les plus petits, encodage plus lent
+Les mesures sont dans benchmarks/bench_compression_profiles.py.
+"""
+
+COMPRESSION_PROFILES = {
+    "fast": {
+        "webp_method": 0,
+        "webp_lossless_method": 0,
+        "png_compress_level": 1,
+        "jpeg_optimize": False,
+        "jpeg_progressive": False,
+        "jpeg_subsampling": "4:2:0",
+    },
+    "balanced": {
+        # method 6 n'apporte quasiment rien vs 4 en lossless (même taille,
+        # vérifié) mais coûte ~10x le temps d'encodage - lossy reste à 6
+        # (peu coûteux là, et ça aide vraiment la taille du fichier).
+        "webp_method": 6,
+        "webp_lossless_method": 4,
+        "png_compress_level": 6,
+        "jpeg_optimize": False,
+        "jpeg_progressive": False,
+        "jpeg_subsampling": "4:2:0",
+    },
+    "smallest": {
+        "webp_method": 6,
+        "webp_lossless_method": 6,
+        "png_compress_level": 9,
+        "jpeg_optimize": True,
+        "jpeg_progressive": True,
+        "jpeg_subsampling": "4:2:0",
+    },
+}
+
+PROFILE_NAMES = list(COMPRESSION_PROFILES)
+DEFAULT_PROFILE = "balanced"
+
+
+def encoder_kwargs(output_format, profile=DEFAULT_PROFILE, quality=95, lossless=False):
+    """Arguments à passer à img.save() pour un format et un profil donnés"""
+    settings = COMPRESSION_PROFILES.get(profile, COMPRESSION_PROFILES[DEFAULT_PROFILE])
+
+    if output_format == "png":
+        return {"compress_level": settings["png_compress_level"]}
+
+    if output_format == "webp":
+        if lossless:
+            return {"lossless": True, "quality": quality, "method": settings["webp_lossless_method"]}
+        return {"quality": quality, "method": settings["webp_method"]}
+
+    # jpg/jpeg
+    return {
+        "quality": quality,
+        "optimize": settings["jpeg_optimize"],
+        "progressive": settings["jpeg_progressive"],
+        "subsampling": settings["jpeg_subsampling"],
+    }
@@ -0,0 +1,102 @@
+"""
+Allocation de noms de fichiers sans collision pour les savers TOO-Pack.
+Chaque dossier de sortie est scanné une seule fois (os.scandir) ; on garde en
+mémoire le compteur le plus haut utilisé par nom de base. Les noms sont
+réservés atomiquement en créant le fichier avec O_EXCL : deux queues qui
+écrivent dans le même dossier ne peuvent pas obtenir le même nom.
+"""
+import os
+import re
+import threading
+
+# Seuls les suffixes écrits par l'allocateur ({n:03d}) : exactement 3 chiffres,
+# ou 4+ chiffres sans zéro initial (au-delà de 999). Les index de batch _0003
+# ne sont pas des compteurs.
+_COUNTER_RE = re.compile(r"^(?P<stem>.*)_(?P<counter>\d{3}|[1-9]\d{3,})\.(?P<ext>[^.]+)$")
+
+
+class FilenameAllocator:
+    """Index {dossier: {(stem, ext): compteur max}} partagé par tous les savers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}
+
+    def _index(self, directory):
+        index = self._dirs.get(directory)
+        if index is None:
+            index = {}
+            beyond = {}  # compteurs >= 1000 : {(stem, ext): {n, ...}}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        match = _COUNTER_RE.match(entry.name)
+                        if match:
+                            key = (match.group("stem"), match.group("ext").lower())
+                            counter = int(match.group("counter"))
+                            if counter >= 1000:
+                                beyond.setdefault(key, set()).add(counter)
+                            elif counter > index.get(key, 0):
+                                index[key] = counter
+            except FileNotFoundError:
+                pass
+            # Un compteur >= 1000 n'est écrit qu'après 999 : on ne suit que la suite
+            # continue 999, 1000, 1001... (shot_153012, img_20261018 sont des horodatages)
+            for key, counters in beyond.items():
+                counter = index.get(key, 0)
+                while counter >= 999 and counter + 1 in counters:
+                    counter += 1
+                index[key] = counter
+            self._dirs[directory] = index
+        return index
+
+    @staticmethod
+    def _try_create(filepath):
+        try:
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def reserve(self, directory, filename, counter_stem, ext):
+        """
+        Réserve un nom dans directory et retourne le chemin complet (fichier vide créé).
+        - essaie d'abord filename tel quel
+        - sinon {counter_stem}_{n:03d}.{ext}, n = compteur max connu + 1
+        """
+        # Le nom peut contenir un sous-dossier (ex: prefix "projet/render")
+        directory = os.path.dirname(os.path.join(directory, filename))
+        filename = os.path.basename(filename)
+        counter_stem = os.path.basename(counter_stem)
+
+        with self._lock:
+            filepath = os.path.join(directory, filename)
+            if self._try_create(filepath):
+                return filepath
+
+            index = self._index(directory)
+            key = (counter_stem, ext.lower())
+            counter = index.get(key, 0) + 1
+            while True:
+                filepath = os.path.join(directory, f"{counter_stem}_{counter:03d}.{ext}")
+                if self._try_create(filepath):
+                    index[key] = counter
+                    return filepath
+                # Créé entre-temps par un autre process : on continue
+                counter += 1
+
+    def release(self, filepath):
+        """Supprime une réservation restée vide (écriture échouée)"""
+        try:
+            if os.path.getsize(filepath) == 0:
+                os.remove(filepath)
+        except OSError:
+            pass
+
+
+_allocator = FilenameAllocator()
+
+
+def get_allocator():
+    return _allocator
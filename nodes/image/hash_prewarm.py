@@ -0,0 +1,167 @@
+"""
+Pré-calcul en arrière-plan des hashes des checkpoints et LoRAs (opt-in).
+Un thread unique parcourt les listes folder_paths "checkpoints" et "loras" et
+remplit l'index persistant (model_hashes) avant qu'une sauvegarde n'en ait
+besoin. Les lectures sont bridées (Mo/s) pour ne pas gêner le chargement des
+modèles, et le bridage saute dès qu'une génération attend le même fichier.
+La liste est revérifiée périodiquement : un modèle ajouté pendant la nuit est
+hashé sans bloquer la queue.
+
+Activation : variable d'environnement TOO_HASH_PREWARM=1 (au démarrage) ou
+POST /too/hashes/prewarm. Débit max : TOO_HASH_PREWARM_MBPS (défaut 100).
+"""
+import os
+import threading
+import time
+
+import folder_paths
+
+from .model_hashes import get_hash_index
+
+# Type de dossier -> hash utilisé par TOOImageMetadata/FileNaming
+PREWARM_KINDS = {"loras": "autov3", "checkpoints": "sha256"}
+# Délai avant le premier passage (laisser ComfyUI finir de démarrer)
+START_DELAY = 30
+# Intervalle de revérification des listes de modèles
+RESCAN_INTERVAL = 300
+
+
+class _RateLimiter:
+    """Bridage simple : dort pour ne pas dépasser max_bytes_per_s en moyenne"""
+
+    def __init__(self, max_mbps):
+        self.rate = max(1.0, float(max_mbps)) * 1024 * 1024
+        self.start = time.monotonic()
+        self.done = 0
+
+    def __call__(self, nbytes):
+        self.done += nbytes
+        ahead = self.done / self.rate - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+class HashPrewarmer:
+    def __init__(self, max_mbps=100):
+        self.max_mbps = max_mbps
+        self._thread = None
+        self._lock = threading.Lock()
+        self._rescan = threading.Event()
+        self._signature = None
+        self.status = {
+            "state": "stopped",
+            "files_total": 0,
+            "files_done": 0,
+            "bytes_total": 0,
+            "bytes_done": 0,
+            "current": "",
+            "errors": 0,
+            "last_scan": None,
+        }
+
+    def start(self, delay=START_DELAY):
+        """Démarre le thread (idempotent) ; s'il tourne déjà, force une revérification"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                self._rescan.set()
+                return False
+            self.status["state"] = "waiting"
+            self._thread = threading.Thread(target=self._run, args=(delay,),
+                                            name="TOO-hash-prewarm", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, delay):
+        if delay:
+            self._rescan.wait(delay)
+        while True:
+            self._rescan.clear()
+            try:
+                self._pass()
+            except Exception as e:
+                print(f"⚠️ TOO-Pack: Pré-calcul des hashes interrompu: {e}")
+            self.status["state"] = "idle"
+            self._rescan.wait(RESCAN_INTERVAL)
+
+    def _list_files(self):
+        files = []
+        for folder, kind in PREWARM_KINDS.items():
+            try:
+                names = folder_paths.get_filename_list(folder)
+            except Exception:
+                continue
+            for name in names:
+                path = folder_paths.get_full_path(folder, name)
+                if path:
+                    files.append((path, kind))
+        return files
+
+    def _pass(self):
+        self.status["state"] = "scanning"
+        files = self._list_files()
+        signature = tuple(files)
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        index = get_hash_index()
+        todo = []
+        for path, kind in files:
+            try:
+                if not index.lookup(path, kind):
+                    todo.append((path, kind, os.path.getsize(path)))
+            except OSError:
+                continue
+
+        status = self.status
+        status.update({
+            "state": "hashing" if todo else "idle",
+            "files_total": len(todo),
+            "files_done": 0,
+            "bytes_total": sum(size for _, _, size in todo),
+            "bytes_done": 0,
+            "errors": 0,
+            "last_scan": time.time(),
+        })
+        if todo:
+            print(f"🔑 TOO-Pack: Pré-calcul de {len(todo)} hash(es) de modèles en arrière-plan")
+
+        limiter = _RateLimiter(self.max_mbps)
+        for path, kind, size in todo:
+            status["current"] = os.path.basename(path)
+            try:
+                index.get(path, kind, throttle=limiter)
+            except Exception as e:
+                status["errors"] += 1
+                print(f"⚠️ TOO-Pack: Hash impossible pour {path}: {e}")
+            status["files_done"] += 1
+            status["bytes_done"] += size
+        status["current"] = ""
+        index.flush()
+        if status["errors"]:
+            # Réessayer les fichiers en erreur au prochain passage
+            self._signature = None
+
+    def get_status(self):
+        return dict(self.status)
+
+
+_prewarmer = None
+
+
+def get_prewarmer():
+    global _prewarmer
+    if _prewarmer is None:
+        try:
+            max_mbps = float(os.environ.get("TOO_HASH_PREWARM_MBPS", 100))
+        except ValueError:
+            max_mbps = 100
+        _prewarmer = HashPrewarmer(max_mbps)
+    return _prewarmer
+
+
+def start_from_env():
+    """Démarre le pré-calcul si TOO_HASH_PREWARM est activé"""
+    if os.environ.get("TOO_HASH_PREWARM", "").lower() in ("1", "true", "yes", "on"):
+        get_prewarmer().start()
+        print("🔑 TOO-Pack: Pré-calcul des hashes de modèles activé (TOO_HASH_PREWARM)")
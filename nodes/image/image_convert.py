@@ -0,0 +1,60 @@
+"""
+Conversion tensor ComfyUI -> uint8 pour les savers TOO-Pack.
+Tout le batch est converti en une fois sur le device d'origine (clamp, *255,
+cast uint8), puis rapatrié en un seul transfert. Les encodeurs reçoivent des
+vues numpy sans copie.
+Sens inverse pour les loaders : uint8 décodé -> IMAGE/MASK float32.
+"""
+import numpy as np
+import torch
+
+
+def tensor_batch_to_uint8(images):
+    """
+    Convertit un batch IMAGE [B, H, W, C] (float 0-1) en np.ndarray uint8 [B, H, W, C].
+    Une seule synchro device et un seul transfert par batch ; pixels[i] est une vue.
+    """
+    if images.dim() == 3:
+        images = images.unsqueeze(0)
+
+    # Un seul temporaire float sur le device, puis cast uint8 (troncature,
+    # comme l'ancien astype(np.uint8))
+    batch = images.mul(255).clamp_(0, 255).to(torch.uint8)
+
+    if batch.device.type == "cuda":
+        # Transfert non bloquant vers de la mémoire épinglée, une synchro pour tout le batch
+        host = torch.empty(batch.shape, dtype=torch.uint8, pin_memory=True)
+        host.copy_(batch, non_blocking=True)
+        torch.cuda.current_stream(batch.device).synchronize()
+        return host.numpy()
+
+    return batch.cpu().contiguous().numpy()
+
+
+def iter_uint8_bands(image, band_rows):
+    """
+    Convertit une image [H, W, C] (float 0-1) en bandes uint8 [rows, W, C] successives.
+    Seule une bande à la fois existe côté hôte : pour les très grandes images
+    (grilles 16k) qu'on ne veut pas matérialiser entièrement en float puis en uint8.
+    """
+    height = image.shape[0]
+    for y0 in range(0, height, band_rows):
+        band = image[y0:y0 + band_rows].mul(255).clamp_(0, 255).to(torch.uint8)
+        yield band.cpu().contiguous().numpy()
+
+
+def uint8_to_image_tensor(pixels):
+    """np.ndarray uint8 [H, W, C] -> IMAGE [1, H, W, 3] float32 (canal alpha ignoré)"""
+    img_array = pixels[:, :, :3].astype(np.float32) / 255.0
+    return torch.from_numpy(img_array)[None,]
+
+
+def uint8_to_mask_tensor(pixels):
+    """
+    MASK [1, H, W] depuis le canal alpha (1.0 = transparent/masqué) ;
+    masque vide (zéros) si l'image n'a pas d'alpha
+    """
+    if pixels.shape[2] == 4:
+        alpha = pixels[:, :, 3].astype(np.float32) / 255.0
+        return torch.from_numpy(1.0 - alpha)[None,]
+    return torch.zeros(1, pixels.shape[0], pixels.shape[1])
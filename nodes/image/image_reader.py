@@ -0,0 +1,223 @@
+"""
+Lecture unifiée d'un fichier image pour les loaders TOO-Pack
+(SmartImageLoader, TOOSimpleImageLoader).
+Le fichier est ouvert une seule fois : les chunks texte PNG ou l'EXIF
+(WEBP/JPEG) sont lus et parsés une fois, puis les pixels sont décodés depuis
+le même handle. Auparavant, métadonnées, workflow et pixels ouvraient chacun
+le fichier (et piexif relisait tout le fichier deux fois).
+Les métadonnées sont lues par metadata_scan (en-têtes seulement) : sans
+pixels à charger, le fichier n'est jamais décodé.
+Les pixels décodés passent par le cache LRU partagé (decoded_cache) puis,
+s'il est activé, par le cache disque .npy (disk_image_cache).
+"""
+import json
+import os
+import struct
+
+import numpy as np
+import piexif
+import piexif.helper
+from PIL import Image
+
+from .decoded_cache import DecodedImageCache, get_image_cache
+from .disk_image_cache import get_disk_cache
+from .metadata_scan import scan_metadata
+from .save_metadata import decode_workflow_text
+
+# Préfixes d'un bloc EXIF que piexif sait lire depuis des octets
+_EXIF_PREFIXES = (b"Exif", b"II", b"MM")
+
+
+class ImageFileData:
+    """
+    parameters : texte A1111/Civitai ("parameters" PNG ou EXIF UserComment), ou None
+    workflow   : {"extra_pnginfo": {...}, "prompt": {...}} (clés absentes si vides)
+    pixels     : np.ndarray uint8 [H, W, 3], ou [H, W, 4] si l'image est RGBA ; None si non chargé
+    """
+    __slots__ = ("parameters", "workflow", "pixels")
+
+    def __init__(self, parameters=None, workflow=None, pixels=None):
+        self.parameters = parameters
+        self.workflow = workflow if workflow is not None else {}
+        self.pixels = pixels
+
+
+def workflow_from_png_info(info):
+    """Workflow depuis les chunks texte PNG {clé: texte}"""
+    workflow = {}
+    extra_pnginfo = {}
+    prompt = None
+
+    for key, value in info.items():
+        if key == "prompt":
+            try:
+                prompt = json.loads(value)
+            except:
+                pass
+        elif key != "parameters":  # Ignorer "parameters" qui contient les métadonnées A1111
+            try:
+                extra_pnginfo[key] = json.loads(value)
+            except:
+                extra_pnginfo[key] = value
+
+    if extra_pnginfo:
+        workflow["extra_pnginfo"] = extra_pnginfo
+    if prompt:
+        workflow["prompt"] = prompt
+    return workflow
+
+
+def workflow_from_exif(exif_dict):
+    """Workflow depuis les tags EXIF 0th au format "clé:json" (Make/Model...)"""
+    workflow = {}
+    extra_pnginfo = {}
+    prompt = None
+
+    for tag, value in exif_dict.get("0th", {}).items():
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='ignore')
+
+        if isinstance(value, str) and ':' in value:
+            key, json_str = value.split(':', 1)
+            try:
+                parsed = json.loads(decode_workflow_text(json_str))
+                if key == "prompt":
+                    prompt = parsed
+                else:
+                    extra_pnginfo[key] = parsed
+            except:
+                pass
+
+    if extra_pnginfo:
+        workflow["extra_pnginfo"] = extra_pnginfo
+    if prompt:
+        workflow["prompt"] = prompt
+    return workflow
+
+
+def parameters_from_exif(exif_dict):
+    """Texte A1111 depuis ExifIFD.UserComment, ou None"""
+    user_comment_raw = exif_dict.get("Exif", {}).get(piexif.ExifIFD.UserComment)
+    if user_comment_raw is None:
+        return None
+    return piexif.helper.UserComment.load(user_comment_raw)
+
+
+def decode_pixels(img):
+    """uint8 [H, W, 4] pour une image RGBA, sinon [H, W, 3] (convert("RGB"))"""
+    if img.mode == "RGBA":
+        return np.asarray(img)
+    return np.asarray(img.convert("RGB"))
+
+
+def _apply_exif(data, exif_dict, log_name):
+    data.workflow = workflow_from_exif(exif_dict)
+    try:
+        data.parameters = parameters_from_exif(exif_dict)
+    except Exception as e:
+        print(f"{log_name}: Error decoding UserComment: {e}")
+
+
+def _load_exif_bytes(exif_bytes):
+    if exif_bytes and exif_bytes.startswith(_EXIF_PREFIXES):
+        return piexif.load(exif_bytes)
+    return {}
+
+
+def _apply_header(data, header, filepath, log_name):
+    """Métadonnées depuis le scan d'en-tête (PNG : chunks texte, WEBP/JPEG : EXIF)"""
+    if header.format == "PNG":
+        data.parameters = header.texts.get("parameters")
+        data.workflow = workflow_from_png_info(header.texts)
+        return
+    try:
+        _apply_exif(data, _load_exif_bytes(header.exif), log_name)
+    except Exception as e:
+        print(f"{log_name}: No EXIF metadata found in '{filepath}': {e}")
+
+
+def _apply_pil_info(data, img, filepath, log_name):
+    """Formats non gérés par le scan (BMP, TIFF...) : EXIF via Pillow / piexif"""
+    try:
+        exif_bytes = img.info.get("exif")
+        if exif_bytes:
+            exif_dict = _load_exif_bytes(exif_bytes)
+        elif img.format == "TIFF":
+            # L'EXIF d'un TIFF est son propre en-tête, pas un bloc img.info["exif"]
+            exif_dict = piexif.load(filepath)
+        else:
+            exif_dict = {}
+        _apply_exif(data, exif_dict, log_name)
+    except Exception as e:
+        print(f"{log_name}: No EXIF metadata found in '{filepath}': {e}")
+
+
+def _load_pixels(f, filepath):
+    """
+    Pixels du fichier ouvert f : cache mémoire, puis cache disque (.npy projeté),
+    puis décodage Pillow. La clé (chemin, taille, mtime_ns) vient du handle ouvert.
+    """
+    memory = get_image_cache()
+    disk = get_disk_cache()
+    key = DecodedImageCache.key(filepath, os.fstat(f.fileno()))
+
+    if memory is not None:
+        pixels = memory.get(key)
+        if pixels is not None:
+            return pixels
+
+    if disk is not None:
+        # Projection du .npy : servie telle quelle, jamais gardée dans le cache mémoire
+        # (pages du cache système, et le fichier doit rester supprimable à l'éviction)
+        pixels = disk.get(key)
+        if pixels is not None:
+            return pixels
+
+    f.seek(0)
+    with Image.open(f) as img:
+        pixels = decode_pixels(img)
+    if disk is not None:
+        disk.put(key, pixels)
+    if memory is not None:
+        memory.put(key, pixels)
+    return pixels
+
+
+def read_image_file(filepath, load_pixels=True, log_name="TOO-Pack"):
+    """
+    Ouvre filepath une seule fois et retourne un ImageFileData.
+    Les métadonnées viennent du scan d'en-tête (metadata_scan) ; avec
+    load_pixels=False, PNG/WEBP/JPEG ne passent pas du tout par Pillow.
+    Une erreur d'ouverture ou de décodage des pixels est levée ; une
+    métadonnée illisible est seulement signalée (parameters/workflow vides).
+    """
+    data = ImageFileData()
+
+    with open(filepath, "rb") as f:
+        try:
+            header = scan_metadata(f)
+            if header is not None:
+                _apply_header(data, header, filepath, log_name)
+            else:
+                # Format non géré par le scan : métadonnées via Pillow
+                f.seek(0)
+                with Image.open(f) as img:
+                    _apply_pil_info(data, img, filepath, log_name)
+        except (EOFError, OSError, struct.error) as e:
+            print(f"{log_name}: No metadata found in '{filepath}': {e}")
+
+        if load_pixels:
+            data.pixels = _load_pixels(f, filepath)
+
+    return data
+
+
+def read_image_pixels(filepath):
+    """Pixels seuls (uint8, voir decode_pixels), servis par les caches si possible"""
+    with open(filepath, "rb") as f:
+        return _load_pixels(f, filepath)
+
+
+def read_image_metadata(filepath, log_name="TOO-Pack"):
+    """Métadonnées seules (parameters, workflow), sans décoder les pixels"""
+    return read_image_file(filepath, load_pixels=False, log_name=log_name)
@@ -0,0 +1,171 @@
+"""
+Lecture des métadonnées d'une image sans toucher aux pixels.
+Parcourt seulement la structure du conteneur (en-têtes de chunks/segments,
+les données image sont sautées par seek) :
+- PNG  : chunks tEXt / zTXt / iTXt, arrêt au premier IDAT (comme Image.open)
+- WEBP : chunks RIFF "EXIF" et "XMP "
+- JPEG : segments APP1 (Exif, XMP), arrêt au début des données (SOS)
+Chaque bloc lu est borné (MAX_BLOCK_SIZE) ainsi que le total (MAX_TOTAL_SIZE) :
+un fichier corrompu ou hostile ne peut pas faire lire/décompresser plus que ça.
+Utilisé par image_reader pour le chemin "métadonnées seules" des loaders.
+"""
+import struct
+import zlib
+
+# Un bloc de métadonnées (chunk texte, EXIF, XMP), compressé ou non
+MAX_BLOCK_SIZE = 64 * 1024 * 1024
+# Total des octets de métadonnées lus (et décompressés) pour un fichier
+MAX_TOTAL_SIZE = 128 * 1024 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_EXIF_HEADER = b"Exif\x00\x00"
+_XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+
+
+class HeaderMetadata:
+    """
+    format : "PNG", "WEBP" ou "JPEG"
+    texts  : chunks texte PNG {clé: texte} (le dernier gagne, comme img.info)
+    exif   : bloc EXIF brut (commence par "Exif" ou un en-tête TIFF), ou None
+    xmp    : paquet XMP brut, ou None
+    """
+    __slots__ = ("format", "texts", "exif", "xmp", "_budget")
+
+    def __init__(self, format):
+        self.format = format
+        self.texts = {}
+        self.exif = None
+        self.xmp = None
+        self._budget = MAX_TOTAL_SIZE
+
+    def _take(self, size):
+        """Réserve size octets du budget ; False si le bloc doit être ignoré"""
+        if size > MAX_BLOCK_SIZE or size > self._budget:
+            return False
+        self._budget -= size
+        return True
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("truncated file")
+    return data
+
+
+def _inflate(meta, data):
+    """Décompression zlib bornée par le budget restant"""
+    limit = min(MAX_BLOCK_SIZE, meta._budget)
+    d = zlib.decompressobj()
+    text = d.decompress(data, limit)
+    if d.unconsumed_tail or not meta._take(len(text)):
+        raise ValueError("decompressed text too large")
+    return text
+
+
+def _png_text(meta, chunk_type, data):
+    key, _, rest = data.partition(b"\x00")
+    key = key.decode("latin-1", "replace")
+    if chunk_type == b"tEXt":
+        return key, rest.decode("latin-1", "replace")
+    if chunk_type == b"zTXt":
+        # méthode de compression (1 octet, 0 = zlib) puis données
+        return key, _inflate(meta, rest[1:]).decode("latin-1", "replace")
+    # iTXt : flag de compression, méthode, langue\0, mot-clé traduit\0, texte UTF-8
+    compressed = rest[:1] == b"\x01"
+    _, _, rest = rest[2:].partition(b"\x00")
+    _, _, text = rest.partition(b"\x00")
+    if compressed:
+        text = _inflate(meta, text)
+    return key, text.decode("utf-8", "replace")
+
+
+def _scan_png(f):
+    meta = HeaderMetadata("PNG")
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        if chunk_type in (b"tEXt", b"zTXt", b"iTXt") and meta._take(length):
+            data = _read_exact(f, length)
+            try:
+                key, text = _png_text(meta, chunk_type, data)
+                meta.texts[key] = text
+            except (ValueError, zlib.error):
+                pass  # chunk illisible ou trop gros : ignoré, comme un chunk absent
+            f.seek(4, 1)  # CRC
+        else:
+            f.seek(length + 4, 1)
+    return meta
+
+
+def _scan_webp(f):
+    meta = HeaderMetadata("WEBP")
+    # En WEBP étendu, EXIF/XMP suivent les données image : on saute les autres chunks
+    while meta.exif is None or meta.xmp is None:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        fourcc, size = struct.unpack("<4sI", header)
+        padded = size + (size & 1)
+        if fourcc in (b"EXIF", b"XMP ") and meta._take(size):
+            data = _read_exact(f, size)
+            if fourcc == b"EXIF":
+                meta.exif = data
+            else:
+                meta.xmp = data
+            f.seek(padded - size, 1)
+        else:
+            f.seek(padded, 1)
+    return meta
+
+
+def _scan_jpeg(f):
+    meta = HeaderMetadata("JPEG")
+    while meta.exif is None or meta.xmp is None:
+        byte = f.read(1)
+        if not byte:
+            break
+        if byte != b"\xff":
+            break  # structure inattendue : on s'arrête là
+        marker = f.read(1)
+        while marker == b"\xff":  # octets de remplissage
+            marker = f.read(1)
+        if not marker or marker in (b"\xda", b"\xd9"):  # SOS / EOI : fin de l'en-tête
+            break
+        if b"\xd0" <= marker <= b"\xd7" or marker == b"\x01":  # marqueurs sans longueur
+            continue
+        length = struct.unpack(">H", _read_exact(f, 2))[0] - 2
+        if length < 0:
+            break
+        if marker == b"\xe1" and meta._take(length):
+            data = _read_exact(f, length)
+            if data.startswith(_EXIF_HEADER) and meta.exif is None:
+                meta.exif = data
+            elif data.startswith(_XMP_HEADER) and meta.xmp is None:
+                meta.xmp = data[len(_XMP_HEADER):]
+        else:
+            f.seek(length, 1)
+    return meta
+
+
+def scan_metadata(f):
+    """
+    Métadonnées d'un fichier image ouvert en binaire (lecture à partir de la position 0).
+    Retourne un HeaderMetadata, ou None si le format n'est pas géré (BMP, TIFF...).
+    Lève EOFError/OSError sur un fichier tronqué ou illisible.
+    """
+    f.seek(0)
+    head = f.read(12)
+    if head.startswith(PNG_SIGNATURE):
+        f.seek(len(PNG_SIGNATURE))
+        return _scan_png(f)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _scan_webp(f)
+    if head[:2] == b"\xff\xd8":
+        f.seek(2)
+        return _scan_jpeg(f)
+    return None
@@ -0,0 +1,261 @@
+"""
+Index persistant des hashes de modèles et LoRAs (TOOImageMetadata, FileNaming).
+Chaque fichier est identifié par (realpath, taille, mtime_ns) : tant qu'il n'a
+pas changé, ses hashes sont relus depuis user/too_model_hashes.json au lieu
+de relire des Go depuis le disque à chaque exécution.
+- sha256 : hash du fichier complet (AutoV2 = 10 premiers caractères)
+- autov3 : hash des données safetensors hors header (12 premiers caractères)
+
+Lectures par blocs de 8 Mo dans un buffer réutilisé : hashlib relâche le GIL
+sur les gros buffers, donc plusieurs fichiers (les LoRAs d'un même prompt)
+se hashent réellement en parallèle dans le pool get_hash_pool().
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import folder_paths
+
+INDEX_FILENAME = "too_model_hashes.json"
+# Clés __metadata__ safetensors contenant le SHA256 des données hors header
+# (sd-scripts, ModelSpec) : même valeur que notre autov3
+EMBEDDED_AUTOV3_KEYS = ("sshs_model_hash", "modelspec.hash_sha256")
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+HASH_KINDS = ("sha256", "autov3")
+# Écriture de l'index par lots : après FLUSH_EVERY nouveaux hashes, ou FLUSH_DELAY
+# secondes après le premier hash non sauvegardé (et à la sortie du process)
+FLUSH_EVERY = 32
+FLUSH_DELAY = 10.0
+READ_SIZE = 8 * 1024 * 1024
+# Au-delà, le disque (souvent un NAS) sature avant le CPU
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _safetensors_data_offset(f):
+    """Position du début des données (après les 8 octets de taille + header JSON)"""
+    n = int.from_bytes(f.read(8), "little")
+    return n + 8
+
+
+def read_safetensors_metadata(filepath):
+    """__metadata__ du header safetensors (quelques Ko lus), ou {} si absent/illisible"""
+    if not filepath.lower().endswith(".safetensors"):
+        return {}
+    try:
+        with open(filepath, "rb") as f:
+            n = int.from_bytes(f.read(8), "little")
+            if not 0 < n <= MAX_HEADER_SIZE:
+                return {}
+            header = json.loads(f.read(n))
+    except (OSError, ValueError):
+        return {}
+    metadata = header.get("__metadata__") if isinstance(header, dict) else None
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def embedded_autov3(filepath):
+    """
+    Hash AutoV3 déclaré dans le header (sshs_model_hash...), s'il a le bon format.
+    Seul le format est contrôlé (64 hex) : la valeur n'est pas comparée au contenu.
+    """
+    metadata = read_safetensors_metadata(filepath)
+    for key in EMBEDDED_AUTOV3_KEYS:
+        value = metadata.get(key)
+        if not isinstance(value, str):
+            continue
+        value = value.strip().lower()
+        if value.startswith("0x"):
+            value = value[2:]
+        # SHA256 complet uniquement : les hashes "legacy" courts ne sont pas comparables
+        if len(value) == 64 and all(c in "0123456789abcdef" for c in value):
+            return value
+    return None
+
+
+def compute_hash(filepath, kind, throttle=None):
+    """
+    Calcule le hash complet (hexdigest) d'un fichier, sans cache.
+    throttle(n) est appelé après chaque bloc lu (bridage des tâches de fond).
+    """
+    sha256 = hashlib.sha256()
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    with open(filepath, "rb", buffering=0) as f:
+        if kind == "autov3":
+            f.seek(_safetensors_data_offset(f))
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            sha256.update(view[:n])
+            if throttle:
+                throttle(n)
+    return sha256.hexdigest()
+
+
+class ModelHashIndex:
+    """Cache {realpath: {size, mtime_ns, sha256, autov3}} sauvegardé en JSON par lots"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        # Nouveaux hashes pas encore écrits : l'index est réécrit en entier, donc
+        # par lots (FLUSH_EVERY entrées ou FLUSH_DELAY secondes), pas à chaque store()
+        self._dirty = 0
+        self._flush_timer = None
+        # (clé, kind) -> (Future, boost) : un fichier demandé deux fois en même temps
+        # n'est lu qu'une fois ; boost lève le bridage si un appel au premier plan attend
+        self._inflight = {}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f).get("files", {})
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ TOO-Pack: Index des hashes illisible, reconstruit ({e})")
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "files": self._entries}, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ TOO-Pack: Impossible de sauvegarder l'index des hashes: {e}")
+
+    @staticmethod
+    def _key(filepath):
+        realpath = os.path.realpath(filepath)
+        st = os.stat(realpath)
+        return realpath, st.st_size, st.st_mtime_ns
+
+    def lookup(self, filepath, kind, key=None):
+        """Hash connu pour ce fichier dans son état actuel, ou None"""
+        realpath, size, mtime_ns = key or self._key(filepath)
+        with self._lock:
+            entry = self._load().get(realpath)
+            if entry and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+                return entry.get(kind)
+        return None
+
+    def store(self, filepath, kind, digest, key=None):
+        realpath, size, mtime_ns = key or self._key(filepath)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(realpath)
+            if not entry or entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+                # Fichier nouveau ou modifié : les anciens hashes ne valent plus rien
+                entry = {"size": size, "mtime_ns": mtime_ns}
+                entries[realpath] = entry
+            entry[kind] = digest
+            self._dirty += 1
+            if self._dirty >= FLUSH_EVERY:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_locked(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._dirty:
+            self._dirty = 0
+            self._save()
+
+    def flush(self):
+        """Écrit l'index s'il reste des hashes non sauvegardés"""
+        with self._lock:
+            self._flush_locked()
+
+    def get(self, filepath, kind, throttle=None):
+        """
+        Hash du fichier (hexdigest complet), calculé seulement si absent ou périmé.
+        throttle : bridage optionnel (pré-calcul en arrière-plan), ignoré dès
+        qu'un autre appel attend le même fichier.
+        """
+        key = self._key(filepath)
+        digest = self.lookup(filepath, kind, key)
+        if digest:
+            return digest
+
+        with self._lock:
+            inflight = self._inflight.get((key, kind))
+            if inflight is None:
+                inflight = self._inflight[(key, kind)] = (Future(), threading.Event())
+                owner = True
+            else:
+                owner = False
+        pending, boost = inflight
+        if not owner:
+            boost.set()
+            return pending.result()
+
+        limiter = None
+        if throttle:
+            limiter = lambda n: boost.is_set() or throttle(n)
+        try:
+            digest = compute_hash(key[0], kind, limiter)
+            self.store(filepath, kind, digest, key)
+            pending.set_result(digest)
+            return digest
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((key, kind), None)
+
+
+_index = None
+_index_lock = threading.Lock()
+_pool = None
+
+
+def get_hash_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ModelHashIndex(os.path.join(folder_paths.get_user_directory(), INDEX_FILENAME))
+            atexit.register(_index.flush)
+        return _index
+
+
+def get_hash_pool():
+    """Pool partagé pour hasher plusieurs fichiers en parallèle (pool.map)"""
+    global _pool
+    with _index_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="TOO-hash")
+        return _pool
+
+
+def file_sha256(filepath):
+    """SHA256 complet du fichier (AutoV2 = file_sha256(...)[:10])"""
+    return get_hash_index().get(filepath, "sha256")
+
+
+def file_autov3(filepath, trust_embedded=False):
+    """
+    SHA256 hors header safetensors (AutoV3 = file_autov3(...)[:12]).
+    trust_embedded : utiliser le hash déclaré dans le header s'il existe
+    (lecture de quelques Ko au lieu du fichier entier). Confiance sur le format
+    seulement : un hash périmé ou modifié dans le header est retourné tel quel.
+    """
+    index = get_hash_index()
+    if trust_embedded:
+        digest = index.lookup(filepath, "autov3") or embedded_autov3(filepath)
+        if digest:
+            return digest
+    return index.get(filepath, "autov3")
@@ -0,0 +1,121 @@
+"""
+Index nom -> chemin absolu des modèles (checkpoints, loras) pour FileNaming.
+Au lieu de tester os.path.isfile sur chaque racine folder_paths à chaque
+sauvegarde et pour chaque LoRA (coûteux sur des partages réseau), les racines
+sont parcourues une fois (os.scandir) et les noms relatifs et basenames sont
+mis dans un dict. L'index est reconstruit quand le mtime d'un des dossiers
+parcourus change (vérifié au plus toutes les CHECK_INTERVAL secondes, ou
+immédiatement quand un nom est introuvable). Un nom introuvable n'est
+revérifié qu'une fois par intervalle (UNET, GGUF... ne sont jamais indexés).
+"""
+import os
+import threading
+import time
+
+import folder_paths
+
+# Ordre de recherche historique de FileNaming : checkpoints puis loras
+RESOLVER_FOLDERS = ("checkpoints", "loras")
+CHECK_INTERVAL = 5.0
+
+
+def _norm(name):
+    return os.path.normcase(name.replace("\\", "/").strip("/"))
+
+
+class ModelPathResolver:
+    def __init__(self, folders=RESOLVER_FOLDERS):
+        self.folders = folders
+        self._lock = threading.Lock()
+        self._relative = {}
+        self._basenames = {}
+        self._dir_mtimes = {}
+        self._missing = set()  # noms introuvables depuis la dernière vérification
+        self._checked = 0.0
+
+    def _scan(self):
+        relative, basenames, dir_mtimes = {}, {}, {}
+        # Dossiers déjà parcourus (realpath) : un lien symbolique qui reboucle n'est suivi qu'une fois
+        visited = set()
+        for folder in self.folders:
+            try:
+                roots = folder_paths.get_folder_paths(folder)
+            except Exception:
+                continue
+            for root in roots:
+                stack = [root]
+                while stack:
+                    directory = stack.pop()
+                    realpath = os.path.realpath(directory)
+                    if realpath in visited:
+                        continue
+                    visited.add(realpath)
+                    try:
+                        dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+                        entries = list(os.scandir(directory))
+                    except OSError:
+                        continue
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                stack.append(entry.path)
+                            elif entry.is_file():
+                                rel = _norm(os.path.relpath(entry.path, root))
+                                # Premier trouvé gagne, comme l'ancien parcours des racines
+                                relative.setdefault(rel, entry.path)
+                                basenames.setdefault(_norm(entry.name), entry.path)
+                        except OSError:
+                            continue
+        self._relative, self._basenames, self._dir_mtimes = relative, basenames, dir_mtimes
+        self._missing.clear()
+        self._checked = time.monotonic()
+
+    def _is_stale(self):
+        if not self._dir_mtimes:
+            return True
+        for directory, mtime_ns in self._dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < CHECK_INTERVAL:
+            return
+        if not force:
+            self._missing.clear()
+        if self._is_stale():
+            self._scan()
+        else:
+            self._checked = now
+
+    def _find(self, key):
+        return self._relative.get(key) or (self._basenames.get(key) if "/" not in key else None)
+
+    def resolve(self, name):
+        """Chemin absolu d'un modèle à partir d'un chemin, d'un nom relatif ou d'un basename"""
+        if not name:
+            return None
+        if os.path.isabs(name) and os.path.isfile(name):
+            return name
+        key = _norm(name)
+        with self._lock:
+            self._refresh()
+            path = self._find(key)
+            if path is None and key not in self._missing:
+                # Introuvable : peut-être ajouté depuis la dernière vérification
+                self._refresh(force=True)
+                path = self._find(key)
+                if path is None:
+                    self._missing.add(key)
+        return path
+
+
+_resolver = ModelPathResolver()
+
+
+def resolve_model_path(name):
+    return _resolver.resolve(name)
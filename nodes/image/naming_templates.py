@@ -0,0 +1,88 @@
+"""
+Templates de nommage compilés pour FileNaming.
+Un template comme "{#12:seed}_{model}_%date1" est découpé une seule fois en
+littéraux et tokens, puis mis en cache par chaîne : à chaque sauvegarde on ne
+fait plus qu'évaluer le programme avec le contexte de l'exécution.
+Même chose pour les tokens de date (YYYY, MM, timestamp...).
+"""
+import re
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r'\{([^}]+)\}')
+# Les tokens de date sont faits de lettres différentes et remplacés par des
+# chiffres : une alternation en une passe équivaut aux str.replace successifs
+_DATE_RE = re.compile(r'timestamp|YYYY|YY|MM|DD|HH|mm|ss')
+_DATE_FORMATS = {
+    "YYYY": "%Y",
+    "YY": "%y",
+    "MM": "%m",
+    "DD": "%d",
+    "HH": "%H",
+    "mm": "%M",
+    "ss": "%S",
+}
+
+
+class CompiledTemplate:
+    """
+    source      : template d'origine
+    simple      : pas de '{' -> le template entier est un seul token
+    parts       : ((littéral, token, texte brut "{...}"), ...) puis tail
+    first_token : premier token (utilisé pour les métadonnées)
+    """
+    __slots__ = ("source", "simple", "parts", "tail", "first_token")
+
+    def __init__(self, source):
+        self.source = source
+        self.simple = "{" not in source
+        parts = []
+        pos = 0
+        if not self.simple:
+            for match in _TOKEN_RE.finditer(source):
+                parts.append((source[pos:match.start()], match.group(1).strip(), match.group(0)))
+                pos = match.end()
+        self.parts = tuple(parts)
+        self.tail = source[pos:]
+        self.first_token = parts[0][1] if parts else None
+
+    def render(self, resolve):
+        """resolve(token) -> str ou None ; un token non résolu reste tel quel"""
+        out = []
+        for literal, token, raw in self.parts:
+            out.append(literal)
+            out.append(resolve(token) or raw)
+        out.append(self.tail)
+        return "".join(out)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(value):
+    return CompiledTemplate(value)
+
+
+@lru_cache(maxsize=256)
+def compile_date_template(text):
+    """Découpe un texte en (littéral, token date) ; le dernier token est None"""
+    parts = []
+    pos = 0
+    for match in _DATE_RE.finditer(text):
+        parts.append((text[pos:match.start()], match.group(0)))
+        pos = match.end()
+    parts.append((text[pos:], None))
+    return tuple(parts)
+
+
+@lru_cache(maxsize=8)
+def date_values(now):
+    """Valeurs des tokens de date pour un instant donné (calculées une fois par exécution)"""
+    values = {token: now.strftime(fmt) for token, fmt in _DATE_FORMATS.items()}
+    values["timestamp"] = str(int(now.timestamp()))
+    return values
+
+
+def render_date_tokens(text, now):
+    parts = compile_date_template(text)
+    if len(parts) == 1:
+        return text
+    values = date_values(now)
+    return "".join(literal + (values[token] if token else "") for literal, token in parts)
@@ -0,0 +1,87 @@
+"""
+Écriture PNG en flux pour les très grandes images (grilles 16k x 16k...).
+Les lignes arrivent par bandes uint8, sont filtrées (filtre Up, vectorisé
+numpy) puis compressées par zlib et écrites au fil de l'eau en chunks IDAT.
+La mémoire hôte reste de l'ordre de quelques bandes au lieu de
+float32 + uint8 + image PIL pour l'image entière.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+# Au-delà de ce nombre de pixels, les savers passent par l'écriture en flux (PNG)
+STREAM_MIN_PIXELS = 8192 * 8192
+# Taille visée d'une bande de lignes côté hôte
+BAND_BYTES = 16 * 1024 * 1024
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Nombre de canaux -> color type PNG (gris, RGB, RGBA)
+_COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+_FILTER_UP = 2
+
+
+def band_rows(width, channels):
+    """Nombre de lignes par bande pour rester autour de BAND_BYTES"""
+    return max(1, BAND_BYTES // max(1, width * channels))
+
+
+def _write_chunk(f, cid, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(cid)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(cid)) & 0xFFFFFFFF))
+    return len(data) + 12
+
+
+def write_png_stream(filepath, width, height, channels, bands, compress_level=6, pnginfo=None):
+    """
+    Écrit un PNG 8 bits à partir d'un itérable de bandes uint8 [rows, width, channels].
+    pnginfo : PngInfo Pillow optionnel (chunks texte écrits avant les données).
+    Retourne le nombre d'octets écrits.
+    """
+    color_type = _COLOR_TYPES.get(channels)
+    if color_type is None:
+        raise ValueError(f"PNG en flux : {channels} canaux non supportés")
+
+    compressor = zlib.compressobj(compress_level)
+    prev = np.zeros((1, width * channels), dtype=np.uint8)
+    rows_written = 0
+
+    with open(filepath, "wb") as f:
+        f.write(_PNG_SIGNATURE)
+        written = len(_PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+        written += _write_chunk(f, b"IHDR", ihdr)
+
+        after_idat = []
+        if pnginfo is not None:
+            for cid, data, *rest in pnginfo.chunks:
+                if rest and rest[0]:
+                    after_idat.append((cid, data))
+                else:
+                    written += _write_chunk(f, cid, data)
+
+        for band in bands:
+            rows = band.reshape(band.shape[0], width * channels)
+            # Filtre Up : différence avec la ligne du dessus (modulo 256)
+            stacked = np.concatenate((prev, rows))
+            filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+            filtered[:, 0] = _FILTER_UP
+            np.subtract(stacked[1:], stacked[:-1], out=filtered[:, 1:])
+            prev = rows[-1:].copy()
+            rows_written += rows.shape[0]
+
+            data = compressor.compress(filtered)
+            if data:
+                written += _write_chunk(f, b"IDAT", data)
+
+        if rows_written != height:
+            raise ValueError(f"PNG en flux : {rows_written} lignes reçues, {height} attendues")
+
+        written += _write_chunk(f, b"IDAT", compressor.flush())
+        for cid, data in after_idat:
+            written += _write_chunk(f, cid, data)
+        written += _write_chunk(f, b"IEND", b"")
+
+    return written
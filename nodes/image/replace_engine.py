@@ -0,0 +1,70 @@
+"""
+Moteur de remplacement en une passe pour les text_replace_pairs de FileNaming.
+Toutes les paires applicables à une clé sont combinées en une seule
+alternation regex (motifs échappés, dans l'ordre de la config) : chaque valeur
+est parcourue une seule fois au lieu d'un str.replace par paire et par clé.
+À une position donnée, la première règle de la liste qui correspond gagne,
+et le texte remplacé n'est pas re-traité par les règles suivantes.
+Le moteur compilé est mis en cache par config.
+"""
+import re
+from functools import lru_cache
+
+
+class ReplaceEngine:
+    def __init__(self, rules):
+        # rules : ((target, input, output), ...) ; target "" = toutes les clés
+        self.rules = rules
+        self.targets = frozenset(target for target, _, _ in rules if target)
+        self.has_global = any(not target for target, _, _ in rules)
+        self._compiled = {}
+
+    def _program(self, target):
+        """(regex, table) des règles qui s'appliquent à une clé, compilé une fois"""
+        program = self._compiled.get(target)
+        if program is None:
+            table = {}
+            for rule_target, input_str, output_str in self.rules:
+                if not rule_target or rule_target == target:
+                    # Même motif répété : la première règle gagne
+                    table.setdefault(input_str, output_str)
+            regex = re.compile("|".join(re.escape(input_str) for input_str in table)) if table else None
+            program = self._compiled[target] = (regex, table)
+        return program
+
+    def applies_to(self, key):
+        return self.has_global or key in self.targets
+
+    def apply(self, key, text):
+        regex, table = self._program(key if key in self.targets else "")
+        if regex is None:
+            return text
+        return regex.sub(lambda m: table[m.group(0)], text)
+
+    def apply_dict(self, values):
+        """Remplace dans toutes les clés concernées (valeurs converties en str, comme avant)"""
+        for key in values:
+            if self.applies_to(key):
+                values[key] = self.apply(key, str(values[key]))
+
+
+@lru_cache(maxsize=64)
+def _compile(rules):
+    return ReplaceEngine(rules)
+
+
+def compile_replace_pairs(pairs, ignored_targets=()):
+    """
+    Moteur pour une liste de paires {"target", "input", "output"}.
+    Les cibles de ignored_targets (ex. [any1]) sont traitées comme globales.
+    """
+    rules = []
+    for pair in pairs:
+        input_str = pair.get("input", "")
+        if not input_str:
+            continue
+        target = pair.get("target", "")
+        if target in ignored_targets:
+            target = ""
+        rules.append((target, input_str, pair.get("output", "")))
+    return _compile(tuple(rules))
@@ -0,0 +1,101 @@
+"""
+Déduplication par contenu pour les savers TOO-Pack.
+Relancer une queue avec un seed fixe redonne des images identiques au pixel
+près : on hashe le buffer uint8 (blake2b, rapide et relâche le GIL) avec les
+réglages d'encodage, et un petit index par dossier de sortie retrouve le
+fichier déjà écrit. Sur un hit on saute l'encodage et l'écriture :
+- "reuse"    : on retourne le chemin existant
+- "hardlink" : on crée le nouveau nom comme lien physique vers l'existant
+
+L'index est un fichier JSONL en ajout seul (.too_dedup.jsonl) dans chaque dossier.
+Le workflow embarqué n'entre pas dans la clé (il change avec la mise en page
+du graphe) : le fichier réutilisé garde ses propres métadonnées.
+"""
+import hashlib
+import json
+import os
+import threading
+
+DEDUP_MODES = ["off", "reuse", "hardlink"]
+INDEX_FILENAME = ".too_dedup.jsonl"
+
+
+def content_key(pixels, *settings):
+    """Hash des pixels uint8 (+ forme) et des réglages qui changent le fichier produit"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((pixels.shape, str(pixels.dtype)) + settings).encode("utf-8"))
+    h.update(memoryview(pixels).cast("B"))
+    return h.hexdigest()
+
+
+class DedupIndex:
+    """Index {hash: nom de fichier} par dossier, chargé une fois par process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}
+
+    def _load(self, directory):
+        entries = self._dirs.get(directory)
+        if entries is None:
+            entries = {}
+            try:
+                with open(os.path.join(directory, INDEX_FILENAME), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            item = json.loads(line)
+                            entries[item["h"]] = item["f"]
+                        except (ValueError, KeyError):
+                            continue
+            except FileNotFoundError:
+                pass
+            self._dirs[directory] = entries
+        return entries
+
+    def lookup(self, directory, key):
+        """Chemin d'un fichier existant au même contenu, ou None"""
+        with self._lock:
+            entries = self._load(directory)
+            filename = entries.get(key)
+            if filename is None:
+                return None
+            filepath = os.path.join(directory, filename)
+            try:
+                if os.path.getsize(filepath) > 0:
+                    return filepath
+            except OSError:
+                pass
+            # Fichier supprimé ou vide : entrée obsolète
+            del entries[key]
+            return None
+
+    def add(self, directory, key, filepath):
+        filename = os.path.relpath(filepath, directory)
+        with self._lock:
+            entries = self._load(directory)
+            if entries.get(key) == filename:
+                return
+            entries[key] = filename
+            try:
+                with open(os.path.join(directory, INDEX_FILENAME), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"h": key, "f": filename}, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"⚠️ TOO-Pack: Impossible de mettre à jour l'index de déduplication: {e}")
+
+
+def hardlink_to(existing, filepath):
+    """Remplace filepath (réservé) par un lien physique vers existing, atomiquement"""
+    tmp = filepath + ".tmp-link"
+    os.link(existing, tmp)
+    try:
+        os.replace(tmp, filepath)
+    except OSError:
+        os.remove(tmp)
+        raise
+
+
+_index = DedupIndex()
+
+
+def get_dedup_index():
+    return _index
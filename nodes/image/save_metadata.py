@@ -0,0 +1,144 @@
+"""
+Métadonnées des savers TOO-Pack (workflow ComfyUI + paramètres A1111/Civitai).
+Le workflow et le prompt font souvent plusieurs centaines de KB de JSON : ils
+sont sérialisés une seule fois par appel save_images, et les mêmes octets
+(chunks PNG ou bloc EXIF) sont réutilisés pour chaque image du batch.
+
+Option de compression du workflow :
+- PNG : chunks zTXt (décodés nativement par Pillow)
+- EXIF : texte "clé:zlib64:<base64(zlib(json))>", décodé par decode_workflow_text()
+"""
+import base64
+import json
+import zlib
+
+import piexif
+import piexif.helper
+from PIL import PngImagePlugin
+from PIL.PngImagePlugin import PngInfo
+
+# Segment APP1 d'un JPEG : 65535 - 2 octets de longueur
+MAX_JPEG_EXIF_SIZE = 65533
+
+# Préfixe du workflow compressé dans l'EXIF (un JSON ne peut pas commencer par "z")
+COMPRESSED_PREFIX = "zlib64:"
+
+
+def select_workflow_source(workflow, prompt, extra_pnginfo):
+    """
+    Retourne (extra_pnginfo, prompt) à embarquer : le workflow fourni en entrée
+    est prioritaire sur le workflow courant.
+    """
+    if workflow and isinstance(workflow, dict):
+        return workflow.get("extra_pnginfo"), workflow.get("prompt")
+    return extra_pnginfo, prompt
+
+
+def _dumps(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(',', ':'))
+
+
+def compress_workflow_text(text):
+    """JSON -> "zlib64:<base64>" (ASCII, sûr dans un tag EXIF)"""
+    packed = zlib.compress(text.encode("utf-8"), 9)
+    return COMPRESSED_PREFIX + base64.b64encode(packed).decode("ascii")
+
+
+def decode_workflow_text(text):
+    """Retourne le JSON d'un texte de workflow, compressé (zlib64:) ou non"""
+    if isinstance(text, str) and text.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b64decode(text[len(COMPRESSED_PREFIX):])).decode("utf-8")
+    return text
+
+
+def _user_comment(a111_params):
+    return piexif.helper.UserComment.dump(a111_params, encoding="unicode")
+
+
+class SaveMetadata:
+    """
+    Payload de métadonnées construit une fois pour tout un batch.
+    - pnginfo : PngInfo prêt à passer à img.save(pnginfo=...) (PNG)
+    - exif    : octets EXIF prêts à passer à img.save(exif=...) (WEBP/JPEG), ou None
+    """
+
+    def __init__(self, output_format, a111_params=None, extra_pnginfo=None, prompt=None, compress=False):
+        self.output_format = output_format
+        self.a111_params = a111_params or None
+        self.compress = compress
+
+        # Sérialisation JSON unique : [(clé, texte)]
+        self.texts = []
+        if extra_pnginfo:
+            for k, v in extra_pnginfo.items():
+                self.texts.append((k, _dumps(v)))
+        if prompt:
+            self.texts.append(("prompt", _dumps(prompt)))
+
+        self.pnginfo = None
+        self.exif = None
+        if output_format == "png":
+            self.pnginfo = self._build_pnginfo()
+        else:
+            self.exif = self._build_exif()
+
+    def _build_pnginfo(self):
+        pnginfo = PngInfo()
+        if self.a111_params:
+            pnginfo.add_text("parameters", self.a111_params)
+        for k, text in self.texts:
+            # Pillow refuse de relire un zTXt de plus de MAX_TEXT_CHUNK une fois
+            # décompressé : au-delà on garde un tEXt classique
+            zip_text = self.compress and len(text) <= PngImagePlugin.MAX_TEXT_CHUNK
+            pnginfo.add_text(k, text, zip=zip_text)
+        return pnginfo
+
+    def _build_exif(self):
+        exif_bytes = self._dump_exif(self.compress)
+
+        if self.output_format in ["jpg", "jpeg"] and exif_bytes and len(exif_bytes) > MAX_JPEG_EXIF_SIZE:
+            print(f"⚠️ TOO-Pack: Métadonnées trop volumineuses ({len(exif_bytes)} bytes) pour JPEG (max {MAX_JPEG_EXIF_SIZE})")
+            # Essayer avec le workflow compressé
+            if not self.compress and self.texts:
+                exif_bytes = self._dump_exif(True)
+                if len(exif_bytes) <= MAX_JPEG_EXIF_SIZE:
+                    print("   → Workflow sauvegardé compressé")
+                    return exif_bytes
+            # Essayer sans le workflow
+            if self.a111_params:
+                exif_bytes = piexif.dump({"Exif": {piexif.ExifIFD.UserComment: _user_comment(self.a111_params)}})
+                if len(exif_bytes) <= MAX_JPEG_EXIF_SIZE:
+                    print("   → Métadonnées A1111 sauvegardées (workflow omis)")
+                    return exif_bytes
+                print("   → Impossible de sauvegarder les métadonnées")
+            return None
+
+        return exif_bytes
+
+    def _dump_exif(self, compress):
+        exif_dict = {}
+
+        # Workflow ComfyUI dans les tags Make, ImageDescription, ... ; prompt dans Model
+        zeroth = {}
+        extra_idx = 0
+        for k, text in self.texts:
+            if compress:
+                text = compress_workflow_text(text)
+            if k == "prompt":
+                zeroth[piexif.ImageIFD.Model] = f"prompt:{text}"
+            else:
+                zeroth[piexif.ImageIFD.Make - extra_idx] = f"{k}:{text}"
+                extra_idx += 1
+        if zeroth:
+            exif_dict["0th"] = zeroth
+
+        # Paramètres A1111 dans ExifIFD.UserComment
+        if self.a111_params:
+            exif_dict["Exif"] = {piexif.ExifIFD.UserComment: _user_comment(self.a111_params)}
+
+        if not exif_dict:
+            return None
+
+        return piexif.dump(exif_dict)
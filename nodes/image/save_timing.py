@@ -0,0 +1,140 @@
+"""
+Chronométrage par étape des savers TOO-Pack.
+Pour chaque image : conversion tensor, construction des métadonnées,
+encodage, écriture disque (temps cumulé dans write(), l'encodeur écrivant
+directement dans le fichier) et octets écrits. Les étapes faites une fois par batch
+(conversion, métadonnées) sont réparties sur les images du batch.
+Les mesures sont renvoyées dans le payload "ui" du node et peuvent être
+ajoutées à un log JSONL.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+_log_lock = threading.Lock()
+
+# Nom du format Pillow (img.save vers un handle de fichier)
+_PIL_FORMATS = {"png": "PNG", "webp": "WEBP", "jpg": "JPEG", "jpeg": "JPEG"}
+
+
+def elapsed_ms(t0):
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+class SaveTimings:
+    """Mesures d'un appel save_images"""
+
+    def __init__(self, node, batch_size, perf_log=""):
+        self.node = node
+        self.batch_size = max(batch_size, 1)
+        self.perf_log = perf_log
+        self.batch = {}
+        self.records = []
+
+    def batch_stage(self, name, t0):
+        """Enregistre une étape faite une fois pour tout le batch (démarrée à t0)"""
+        self.batch[name] = elapsed_ms(t0)
+
+    def new_record(self, filepath):
+        """Crée la fiche d'une image, avec sa part des étapes du batch"""
+        record = {"file": filepath}
+        for name, ms in self.batch.items():
+            record[name] = round(ms / self.batch_size, 3)
+        self.records.append(record)
+        return record
+
+    def finish(self, record):
+        """À appeler une fois l'image écrite (éventuellement depuis le pool d'écriture)"""
+        if self.perf_log:
+            append_perf_log(self.perf_log, {
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "node": self.node,
+                **record,
+            })
+
+    def ui(self):
+        # Copies : en mode asynchrone les fiches sont encore complétées par le pool
+        return {"save_timings": [dict(r) for r in self.records]}
+
+
+class _TimedWriter:
+    """
+    Handle de fichier qui cumule le temps passé dans write() : l'encodeur écrit
+    directement dans le fichier (pas de copie BytesIO) et on sépare quand même
+    encodage et écriture disque. Pas de fileno() : Pillow passe alors par write()
+    au lieu d'écrire lui-même dans le descripteur.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self.write_s = 0.0
+
+    def write(self, data):
+        t0 = time.perf_counter()
+        n = self._f.write(data)
+        self.write_s += time.perf_counter() - t0
+        return n
+
+    def flush(self):
+        t0 = time.perf_counter()
+        self._f.flush()
+        self.write_s += time.perf_counter() - t0
+
+    def tell(self):
+        return self._f.tell()
+
+    def seek(self, offset, whence=0):
+        return self._f.seek(offset, whence)
+
+
+def encode_and_write(img, filepath, output_format, record=None, **save_kwargs):
+    """
+    Encode directement dans le fichier ouvert, en mesurant séparément
+    l'écriture (temps cumulé dans write()) et l'encodage (le reste).
+    """
+    t0 = time.perf_counter()
+    with open(filepath, "wb") as f:
+        writer = _TimedWriter(f)
+        img.save(writer, format=_PIL_FORMATS[output_format], **save_kwargs)
+        writer.flush()
+        size = f.tell()
+    total_ms = elapsed_ms(t0)
+
+    if record is not None:
+        write_ms = round(writer.write_s * 1000, 3)
+        record["encode_ms"] = round(max(total_ms - write_ms, 0.0), 3)
+        record["write_ms"] = write_ms
+        record["bytes"] = size
+
+
+def resolve_perf_log(output_dir, perf_log):
+    """
+    Chemin absolu du log de perfs, relatif au dossier output.
+    Refusé (None) s'il sort du dossier output (chemin absolu, "..", lien
+    symbolique), comme folder_paths.get_save_image_path.
+    """
+    perf_log = (perf_log or "").strip()
+    if not perf_log:
+        return ""
+    output_dir = os.path.realpath(output_dir)
+    path = os.path.realpath(os.path.join(output_dir, perf_log))
+    if os.path.commonpath((output_dir, path)) != output_dir:
+        print(f"⚠️ TOO-Pack: perf_log '{perf_log}' hors du dossier output, ignoré")
+        return ""
+    return path
+
+
+def append_perf_log(path, entry):
+    """Ajoute une ligne JSON au log de perfs (erreurs ignorées : jamais bloquant)"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with _log_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except Exception as e:
+        print(f"⚠️ TOO-Pack: Impossible d'écrire le log de perfs {path}: {e}")
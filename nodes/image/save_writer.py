@@ -0,0 +1,88 @@
+"""
+Pool d'écriture en arrière-plan pour les savers TOO-Pack.
+L'encodage (WEBP/PNG/JPEG) et l'écriture disque sont confiés à un pool de
+threads borné : Pillow relâche le GIL pendant l'encodage, le thread
+d'exécution de ComfyUI peut donc repartir sur le sampling pendant que le CPU
+compresse.
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class BackgroundWriter:
+    """
+    Pool de threads borné avec backpressure.
+    - submit() bloque quand max_pending jobs sont déjà en attente
+    - flush() attend la fin de tous les jobs soumis
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 2
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = set()
+
+    def submit(self, filepath, fn, *args, **kwargs):
+        """Planifie fn(*args, **kwargs) qui doit écrire filepath. Retourne le Future."""
+        # Backpressure : on bloque le thread appelant tant que la file est pleine
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="TOO-writer"
+                    )
+                future = self._executor.submit(self._run, filepath, fn, args, kwargs)
+                self._futures.add(future)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._forget)
+        return future
+
+    def _run(self, filepath, fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ TOO-Pack: Échec de l'écriture en arrière-plan de {filepath}: {e}")
+            raise
+        finally:
+            self._slots.release()
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def flush(self, timeout=None):
+        """Attend que tous les jobs soumis soient terminés"""
+        with self._lock:
+            futures = list(self._futures)
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def shutdown(self):
+        """Vide la file puis arrête les threads"""
+        self.flush()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Retourne le pool partagé (créé au premier appel, vidé à l'arrêt du serveur)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+            atexit.register(_writer.shutdown)
+        return _writer
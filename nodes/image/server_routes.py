@@ -6,9 +6,14 @@ import server
 import os
 import secrets
 import tempfile
+import time
 import ipaddress
 from aiohttp import web
 
+from .decoded_cache import get_image_cache
+from .dir_index import refresh as refresh_dir_index
+from .hash_prewarm import get_prewarmer, start_from_env
+
 # --- Token secret généré au démarrage du serveur ---------------------------
 TOO_ACCESS_TOKEN = secrets.token_hex(32)
 _TOKEN_FILE = os.path.join(tempfile.gettempdir(), "too_pack_access_token.txt")
@@ -124,3 +129,103 @@ async def view_image(request):
 
 
 print("TOO-Pack: Custom image view route registered at /too/view/image (localhost + token required)")
+
+
+@server.PromptServer.instance.routes.get("/too/hashes/status")
+async def hashes_status(request):
+    """Progression du pré-calcul des hashes de modèles"""
+    auth_error = check_local_and_token(request)
+    if auth_error is not None:
+        return auth_error
+    return web.json_response(get_prewarmer().get_status())
+
+
+@server.PromptServer.instance.routes.post("/too/hashes/prewarm")
+async def hashes_prewarm(request):
+    """Démarre le pré-calcul (ou force une revérification s'il tourne déjà)"""
+    auth_error = check_local_and_token(request)
+    if auth_error is not None:
+        return auth_error
+    started = get_prewarmer().start(delay=0)
+    return web.json_response({"started": started, **get_prewarmer().get_status()})
+
+
+@server.PromptServer.instance.routes.post("/too/images/refresh_index")
+async def images_refresh_index(request):
+    """
+    Vide l'index des dossiers de SmartImageLoader (img_directory).
+    Corps JSON optionnel : {"directory": "..."} ; sans dossier, tout l'index est vidé.
+    """
+    auth_error = check_local_and_token(request)
+    if auth_error is not None:
+        return auth_error
+    directory = None
+    if request.can_read_body:
+        try:
+            directory = (await request.json()).get("directory") or None
+        except (ValueError, AttributeError):
+            return web.Response(status=400, text="Invalid JSON body")
+    return web.json_response({"cleared": refresh_dir_index(directory)})
+
+
+@server.PromptServer.instance.routes.get("/too/images/cache")
+async def images_cache_stats(request):
+    """Compteurs du cache des images décodées (hits, misses, évictions, octets)"""
+    auth_error = check_local_and_token(request)
+    if auth_error is not None:
+        return auth_error
+    cache = get_image_cache()
+    if cache is None:
+        return web.json_response({"enabled": False})
+    return web.json_response({"enabled": True, **cache.get_stats()})
+
+
+@server.PromptServer.instance.routes.post("/too/naming/preview")
+async def naming_preview(request):
+    """
+    Résout le nom de fichier d'un node FileNaming sans exécuter le graphe.
+    Corps JSON : {"node": <node FileNaming sérialisé> ou "config": {...},
+                  "prompt": <prompt format API>, "metadata", "any1", "any2", "any3" (optionnels)}
+    Ni image ni hash de modèle : {model_hash} / lora_hashes restent non résolus.
+    """
+    auth_error = check_local_and_token(request)
+    if auth_error is not None:
+        return auth_error
+
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.Response(status=400, text="Invalid JSON body")
+    if not isinstance(body, dict):
+        return web.Response(status=400, text="Invalid JSON body")
+
+    # Import tardif : server_routes est chargé avant les nodes
+    from .smart_image_saver_adv_naming import FileNaming
+
+    t0 = time.perf_counter()
+    try:
+        naming_node = FileNaming()
+        if isinstance(body.get("config"), dict):
+            config = naming_node._get_config(None)
+            config.update(body["config"])
+        else:
+            config = naming_node.config_from_node(body.get("node") or {})
+        metadata = body.get("metadata") if isinstance(body.get("metadata"), dict) else None
+        naming = naming_node.resolve_naming(config, body.get("prompt") or {}, metadata,
+                                            body.get("any1"), body.get("any2"), body.get("any3"),
+                                            compute_hashes=False)
+    except Exception as e:
+        return web.Response(status=400, text=f"Naming preview failed: {e}")
+
+    filename = f"{naming['filename_base']}.{config.get('output_format', 'webp')}"
+    path = os.path.join(naming["output_folder"], filename) if naming["output_folder"] else filename
+    return web.json_response({
+        "output_folder": naming["output_folder"],
+        "filename": filename,
+        "path": path.replace("\\", "/"),
+        "fields": {k: v if isinstance(v, str) else str(v) for k, v in naming["naming_dict"].items()},
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+    })
+
+
+start_from_env()
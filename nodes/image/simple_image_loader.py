@@ -1,11 +1,9 @@
 import os
 import torch
-import numpy as np
-from PIL import Image
-import piexif
-import piexif.helper
 import re
-import json
+
+from .image_convert import uint8_to_image_tensor, uint8_to_mask_tensor
+from .image_reader import read_image_file, read_image_metadata
 
 class TOOSimpleImageLoader:
     """
@@ -51,17 +49,12 @@ class TOOSimpleImageLoader:
 
         # Extract metadata and workflow from img_path (if provided)
         if img_path and img_path.strip() and os.path.exists(img_path):
-            metadata = self._extract_metadata(img_path)
-            workflow = self._extract_workflow(img_path)
-
-            # If no image input, load the image from img_path
-            if image is None:
-                try:
-                    loaded_image, mask = self._load_image_from_path(img_path)
-                    if loaded_image is not None:
-                        return (loaded_image, mask, metadata, workflow)
-                except Exception as e:
-                    raise ValueError(f"TOOSimpleImageLoader: Failed to load image from '{img_path}': {e}")
+            # Single open: pixels (only without image input) + metadata + workflow
+            loaded_image, mask, metadata, workflow = self._read_file(img_path, load_pixels=image is None)
+
+            # If no image input, use the image loaded from img_path
+            if image is None and loaded_image is not None:
+                return (loaded_image, mask, metadata, workflow)
 
         # Use image input if provided
         if image is not None:
@@ -78,122 +71,29 @@ class TOOSimpleImageLoader:
         """Returns a white mask (all ones) matching image dimensions — shape [B, H, W]"""
         return torch.ones(image_tensor.shape[0], image_tensor.shape[1], image_tensor.shape[2])
 
-    def _extract_metadata(self, filepath):
-        """
-        Extract A1111/Civitai metadata from image
-        PNG: from "parameters" chunk
-        JPEG/WEBP: from EXIF UserComment
-        """
-        metadata = {
-            "model_name": "",
-            "model_hash": "",
-            "lora_hashes": {},
-            "positive": "",
-            "negative": "",
-            "seed": "",
-            "steps": "",
-            "cfg": "",
-            "sampler_name": "",
-            "scheduler": "",
-            "custom": ""
-        }
-
-        try:
-            ext = os.path.splitext(filepath)[1].lower()
-
-            if ext == '.png':
-                try:
-                    img = Image.open(filepath)
-                    if hasattr(img, 'info') and 'parameters' in img.info:
-                        metadata = self._parse_a111_params(img.info['parameters'])
-                except Exception as e:
-                    print(f"TOOSimpleImageLoader: No PNG metadata found in '{filepath}': {e}")
-            else:
-                try:
-                    exif_dict = piexif.load(filepath)
-                    if "Exif" in exif_dict and piexif.ExifIFD.UserComment in exif_dict["Exif"]:
-                        user_comment_raw = exif_dict["Exif"][piexif.ExifIFD.UserComment]
-                        try:
-                            user_comment = piexif.helper.UserComment.load(user_comment_raw)
-                            metadata = self._parse_a111_params(user_comment)
-                        except Exception as e:
-                            print(f"TOOSimpleImageLoader: Error decoding UserComment: {e}")
-                except Exception as e:
-                    print(f"TOOSimpleImageLoader: No EXIF metadata found in '{filepath}': {e}")
-
-        except Exception as e:
-            print(f"TOOSimpleImageLoader: Error reading metadata from '{filepath}': {e}")
-
-        return metadata
-
-    def _extract_workflow(self, filepath):
+    def _read_file(self, filepath, load_pixels=True):
         """
-        Extract ComfyUI workflow from image
-        PNG: from PNG chunks (prompt, workflow, etc.)
-        JPEG/WEBP: from EXIF Make/Model tags
+        Read the file once (see image_reader) and return
+        (image_tensor, mask_tensor, metadata, workflow).
+        image/mask are None when pixels are not loaded or the file can't be decoded.
+        mask convention: 1.0 = masked (transparent), 0.0 = visible (opaque)
         """
-        workflow = {}
-
         try:
-            ext = os.path.splitext(filepath)[1].lower()
-
-            if ext == '.png':
-                try:
-                    img = Image.open(filepath)
-                    if hasattr(img, 'info'):
-                        extra_pnginfo = {}
-                        prompt = None
-
-                        for key, value in img.info.items():
-                            if key == "prompt":
-                                try:
-                                    prompt = json.loads(value)
-                                except:
-                                    pass
-                            elif key != "parameters":
-                                try:
-                                    extra_pnginfo[key] = json.loads(value)
-                                except:
-                                    extra_pnginfo[key] = value
-
-                        if extra_pnginfo:
-                            workflow["extra_pnginfo"] = extra_pnginfo
-                        if prompt:
-                            workflow["prompt"] = prompt
-                except Exception as e:
-                    print(f"TOOSimpleImageLoader: No PNG workflow found in '{filepath}': {e}")
+            if load_pixels:
+                data = read_image_file(filepath, log_name="TOOSimpleImageLoader")
             else:
-                try:
-                    exif_dict = piexif.load(filepath)
-                    if "0th" in exif_dict:
-                        extra_pnginfo = {}
-                        prompt = None
-
-                        for tag, value in exif_dict["0th"].items():
-                            if isinstance(value, bytes):
-                                value = value.decode('utf-8', errors='ignore')
-                            if isinstance(value, str) and ':' in value:
-                                key, json_str = value.split(':', 1)
-                                try:
-                                    parsed = json.loads(json_str)
-                                    if key == "prompt":
-                                        prompt = parsed
-                                    else:
-                                        extra_pnginfo[key] = parsed
-                                except:
-                                    pass
-
-                        if extra_pnginfo:
-                            workflow["extra_pnginfo"] = extra_pnginfo
-                        if prompt:
-                            workflow["prompt"] = prompt
-                except Exception as e:
-                    print(f"TOOSimpleImageLoader: No EXIF workflow found in '{filepath}': {e}")
-
+                # With an image input: metadata only (headers, no pixel decode)
+                data = read_image_metadata(filepath, log_name="TOOSimpleImageLoader")
         except Exception as e:
-            print(f"TOOSimpleImageLoader: Error reading workflow from '{filepath}': {e}")
+            print(f"TOOSimpleImageLoader: Error loading image '{filepath}': {e}")
+            return None, None, self._parse_a111_params(""), {}
 
-        return workflow
+        img_tensor = mask_tensor = None
+        if data.pixels is not None:
+            img_tensor = uint8_to_image_tensor(data.pixels)
+            # Alpha: 0=transparent → 1.0 masked, 1=opaque → 0.0 masked
+            mask_tensor = uint8_to_mask_tensor(data.pixels)
+        return img_tensor, mask_tensor, self._parse_a111_params(data.parameters), data.workflow
 
     def _parse_a111_params(self, params_text):
         """
@@ -292,31 +192,6 @@ class TOOSimpleImageLoader:
 
         return metadata
 
-    def _load_image_from_path(self, path):
-        """Load image from path, return (image_tensor, mask_tensor).
-        Extracts alpha channel if present, otherwise returns white mask.
-        mask convention: 1.0 = masked (transparent), 0.0 = visible (opaque)
-        """
-        try:
-            img = Image.open(path)
-
-            if img.mode == "RGBA":
-                img_array = np.array(img).astype(np.float32) / 255.0
-                img_tensor = torch.from_numpy(img_array[:, :, :3])[None,]
-                # Alpha: 0=transparent → 1.0 masked, 1=opaque → 0.0 masked
-                mask_tensor = torch.from_numpy(1.0 - img_array[:, :, 3])[None,]
-            else:
-                img = img.convert("RGB")
-                img_array = np.array(img).astype(np.float32) / 255.0
-                img_tensor = torch.from_numpy(img_array)[None,]
-                mask_tensor = torch.zeros(1, img_array.shape[0], img_array.shape[1])
-
-            return img_tensor, mask_tensor
-
-        except Exception as e:
-            print(f"TOOSimpleImageLoader: Error loading image '{path}': {e}")
-            return None, None
-
 
 NODE_CLASS_MAPPINGS = {
     "TOOSimpleImageLoader": TOOSimpleImageLoader
@@ -1,12 +1,10 @@
 import os
 import random
-import torch
-import numpy as np
-from PIL import Image
-import piexif
-import piexif.helper
 import re
-import json
+
+from .dir_index import list_images
+from .image_convert import uint8_to_image_tensor
+from .image_reader import read_image_file, read_image_metadata
 
 class SmartImageLoader:
     """
@@ -70,12 +68,11 @@ class SmartImageLoader:
                 if lines:
                     random.seed(seed)
                     file_path = random.choice(lines)
-                    metadata = self._extract_metadata(file_path)
-                    workflow = self._extract_workflow(file_path)
-                    
+                    # Un seul open : pixels (si pas d'image input) + metadata + workflow
+                    loaded_image, metadata, workflow = self._read_file(file_path, load_pixels=image is None)
+
                     # Load image from file only if no image input
                     if image is None:
-                        loaded_image = self._load_image_from_path(file_path)
                         if loaded_image is not None:
                             return (loaded_image, file_path, metadata, workflow)
                     else:
@@ -88,12 +85,11 @@ class SmartImageLoader:
         if img_path and img_path.strip() and os.path.exists(img_path):
             try:
                 file_path = img_path
-                metadata = self._extract_metadata(file_path)
-                workflow = self._extract_workflow(file_path)
-                
+                # Un seul open : pixels (si pas d'image input) + metadata + workflow
+                loaded_image, metadata, workflow = self._read_file(file_path, load_pixels=image is None)
+
                 # Load image from file only if no image input
                 if image is None:
-                    loaded_image = self._load_image_from_path(img_path)
                     if loaded_image is not None:
                         return (loaded_image, file_path, metadata, workflow)
                 else:
@@ -106,34 +102,18 @@ class SmartImageLoader:
         if img_directory and img_directory.strip() and os.path.isdir(img_directory):
             try:
                 valid_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tiff')
-                image_files = []
-
-                if img_dir_level == -1:
-                    # Tous les sous-dossiers
-                    for root, dirs, files in os.walk(img_directory):
-                        for f in files:
-                            if f.lower().endswith(valid_extensions):
-                                image_files.append(os.path.join(root, f))
-                elif img_dir_level == 0:
-                    # Dossier courant uniquement
-                    image_files = [
-                        os.path.join(img_directory, f)
-                        for f in os.listdir(img_directory)
-                        if f.lower().endswith(valid_extensions) and os.path.isfile(os.path.join(img_directory, f))
-                    ]
-                else:
-                    # Profondeur spécifique
-                    image_files = self._get_images_at_depth(img_directory, img_dir_level, valid_extensions)
+                # -1 = tous les sous-dossiers, 0 = dossier courant, N = profondeur spécifique
+                # Liste en cache (partagée entre les nodes), rescannée si un dossier change
+                image_files = list_images(img_directory, img_dir_level, valid_extensions)
 
                 if image_files:
                     random.seed(seed)
                     file_path = random.choice(image_files)
-                    metadata = self._extract_metadata(file_path)
-                    workflow = self._extract_workflow(file_path)
-                    
+                    # Un seul open : pixels (si pas d'image input) + metadata + workflow
+                    loaded_image, metadata, workflow = self._read_file(file_path, load_pixels=image is None)
+
                     # Load image from file only if no image input
                     if image is None:
-                        loaded_image = self._load_image_from_path(file_path)
                         if loaded_image is not None:
                             return (loaded_image, file_path, metadata, workflow)
                     else:
@@ -153,158 +133,23 @@ class SmartImageLoader:
             "Please provide at least one of: image input, txt_path, img_path or img_directory."
         )
 
-    def _get_images_at_depth(self, directory, max_depth, valid_extensions):
-        """Récupère les images jusqu'à une profondeur spécifique"""
-        image_files = []
-
-        def scan_directory(current_dir, current_depth):
-            if current_depth > max_depth:
-                return
-
-            try:
-                for item in os.listdir(current_dir):
-                    item_path = os.path.join(current_dir, item)
-                    if os.path.isfile(item_path) and item.lower().endswith(valid_extensions):
-                        image_files.append(item_path)
-                    elif os.path.isdir(item_path) and current_depth < max_depth:
-                        scan_directory(item_path, current_depth + 1)
-            except Exception as e:
-                print(f"SmartImageLoader: Error scanning '{current_dir}': {e}")
-
-        scan_directory(directory, 0)
-        return image_files
-
-    def _extract_metadata(self, filepath):
+    def _read_file(self, filepath, load_pixels=True):
         """
-        Extrait les métadonnées A1111/Civitai depuis l'image
-        PNG: depuis le chunk "parameters"
-        JPEG/WEBP: depuis l'EXIF UserComment
+        Lit le fichier une seule fois (voir image_reader) et retourne
+        (image tensor ou None, metadata A1111/Civitai, workflow ComfyUI)
         """
-        metadata = {
-            "model_name": "",
-            "model_hash": "",
-            "lora_hashes": {},
-            "positive": "",
-            "negative": "",
-            "seed": "",
-            "steps": "",
-            "cfg": "",
-            "sampler_name": "",
-            "scheduler": "",
-            "custom": ""
-        }
-
         try:
-            # Détecter le format
-            ext = os.path.splitext(filepath)[1].lower()
-            
-            if ext == '.png':
-                # Pour PNG, lire le chunk "parameters"
-                try:
-                    img = Image.open(filepath)
-                    if hasattr(img, 'info') and 'parameters' in img.info:
-                        user_comment = img.info['parameters']
-                        metadata = self._parse_a111_params(user_comment)
-                except Exception as e:
-                    print(f"SmartImageLoader: No PNG metadata found in '{filepath}': {e}")
+            if load_pixels:
+                data = read_image_file(filepath, log_name="SmartImageLoader")
             else:
-                # Pour JPEG/WEBP, utiliser EXIF
-                try:
-                    exif_dict = piexif.load(filepath)
-                    
-                    # Chercher dans ExifIFD.UserComment
-                    if "Exif" in exif_dict and piexif.ExifIFD.UserComment in exif_dict["Exif"]:
-                        user_comment_raw = exif_dict["Exif"][piexif.ExifIFD.UserComment]
-                        
-                        try:
-                            # Décoder UserComment
-                            user_comment = piexif.helper.UserComment.load(user_comment_raw)
-                            metadata = self._parse_a111_params(user_comment)
-                        except Exception as e:
-                            print(f"SmartImageLoader: Error decoding UserComment: {e}")
-                except Exception as e:
-                    print(f"SmartImageLoader: No EXIF metadata found in '{filepath}': {e}")
-            
+                # Avec une image input : métadonnées seules (en-têtes, sans décodage)
+                data = read_image_metadata(filepath, log_name="SmartImageLoader")
         except Exception as e:
-            print(f"SmartImageLoader: Error reading metadata from '{filepath}': {e}")
-        
-        return metadata
+            print(f"SmartImageLoader: Error loading image '{filepath}': {e}")
+            return None, self._parse_a111_params(""), {}
 
-    def _extract_workflow(self, filepath):
-        """
-        Extrait le workflow ComfyUI depuis l'image
-        PNG: depuis les chunks "workflow" et "prompt"
-        JPEG/WEBP: depuis les tags EXIF Make/Model
-        """
-        workflow = {}
-
-        try:
-            # Détecter le format
-            ext = os.path.splitext(filepath)[1].lower()
-            
-            if ext == '.png':
-                # Pour PNG, lire les chunks
-                try:
-                    img = Image.open(filepath)
-                    if hasattr(img, 'info'):
-                        extra_pnginfo = {}
-                        prompt = None
-                        
-                        for key, value in img.info.items():
-                            if key == "prompt":
-                                try:
-                                    prompt = json.loads(value)
-                                except:
-                                    pass
-                            elif key != "parameters":  # Ignorer "parameters" qui contient les métadonnées A1111
-                                try:
-                                    extra_pnginfo[key] = json.loads(value)
-                                except:
-                                    extra_pnginfo[key] = value
-                        
-                        if extra_pnginfo:
-                            workflow["extra_pnginfo"] = extra_pnginfo
-                        if prompt:
-                            workflow["prompt"] = prompt
-                except Exception as e:
-                    print(f"SmartImageLoader: No PNG workflow found in '{filepath}': {e}")
-            else:
-                # Pour JPEG/WEBP, utiliser EXIF
-                try:
-                    exif_dict = piexif.load(filepath)
-                    
-                    if "0th" in exif_dict:
-                        # Reconstituer extra_pnginfo et prompt
-                        extra_pnginfo = {}
-                        prompt = None
-                        
-                        for tag, value in exif_dict["0th"].items():
-                            if isinstance(value, bytes):
-                                value = value.decode('utf-8', errors='ignore')
-                            
-                            # Parser les tags au format "key:json"
-                            if isinstance(value, str) and ':' in value:
-                                key, json_str = value.split(':', 1)
-                                try:
-                                    parsed = json.loads(json_str)
-                                    if key == "prompt":
-                                        prompt = parsed
-                                    else:
-                                        extra_pnginfo[key] = parsed
-                                except:
-                                    pass
-                        
-                        if extra_pnginfo:
-                            workflow["extra_pnginfo"] = extra_pnginfo
-                        if prompt:
-                            workflow["prompt"] = prompt
-                except Exception as e:
-                    print(f"SmartImageLoader: No EXIF workflow found in '{filepath}': {e}")
-                    
-        except Exception as e:
-            print(f"SmartImageLoader: Error reading workflow from '{filepath}': {e}")
-        
-        return workflow
+        loaded_image = uint8_to_image_tensor(data.pixels) if data.pixels is not None else None
+        return loaded_image, self._parse_a111_params(data.parameters), data.workflow
 
     def _parse_a111_params(self, params_text):
         """
@@ -419,18 +264,6 @@ class SmartImageLoader:
 
         return metadata
 
-    def _load_image_from_path(self, path):
-        """Charge une image depuis un chemin et la convertit en tensor ComfyUI"""
-        try:
-            img = Image.open(path)
-            img = img.convert("RGB")
-            img_array = np.array(img).astype(np.float32) / 255.0
-            img_tensor = torch.from_numpy(img_array)[None,]
-            return img_tensor
-        except Exception as e:
-            print(f"SmartImageLoader: Error loading image '{path}': {e}")
-            return None
-
 # Enregistrement du node
 NODE_CLASS_MAPPINGS = {
     "SmartImageLoader": SmartImageLoader
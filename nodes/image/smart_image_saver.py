@@ -1,14 +1,19 @@
 import os
-import json
 import re
+import time
 from datetime import datetime
 from PIL import Image
-import numpy as np
 import folder_paths
 from comfy.cli_args import args
 
-import piexif
-import piexif.helper
+from .encoder_profiles import DEFAULT_PROFILE, PROFILE_NAMES, encoder_kwargs
+from .filename_allocator import get_allocator
+from .image_convert import iter_uint8_bands, tensor_batch_to_uint8
+from .png_stream import STREAM_MIN_PIXELS, band_rows, write_png_stream
+from .save_dedup import DEDUP_MODES, content_key, get_dedup_index, hardlink_to
+from .save_metadata import SaveMetadata, select_workflow_source
+from .save_timing import SaveTimings, elapsed_ms, encode_and_write, resolve_perf_log
+from .save_writer import get_writer
 
 class TOOSmartImageSaver:
     """
@@ -123,6 +128,27 @@ class TOOSmartImageSaver:
                 "workflow": ("WORKFLOW", {
                     "tooltip": "Workflow ComfyUI à embarquer (écrase le workflow courant si embed_workflow activé)"
                 }),
+                "compression_profile": (PROFILE_NAMES, {
+                    "default": DEFAULT_PROFILE,
+                    "tooltip": "Compromis vitesse/taille de l'encodeur. fast: ~5x plus rapide, fichiers plus gros (aperçus). balanced: réglages par défaut. smallest: fichiers les plus petits, plus lent."
+                }),
+                "compress_workflow": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Compresser le workflow embarqué (zTXt en PNG, zlib+base64 en EXIF). Fichiers plus légers et workflow conservé en JPEG, mais seuls les loaders TOO savent le relire en WEBP/JPEG."
+                }),
+                "async_save": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Encoder et écrire les images en arrière-plan. Le node retourne immédiatement les chemins réservés (le fichier peut ne pas encore exister)."
+                }),
+                "perf_log": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "Fichier JSONL où ajouter les temps par étape de chaque image (conversion, métadonnées, encodage, écriture, octets). Relatif au dossier output (les chemins qui en sortent sont ignorés). Vide = désactivé."
+                }),
+                "dedup": (DEDUP_MODES, {
+                    "default": "off",
+                    "tooltip": "Ne pas réécrire une image identique au pixel près (même format/réglages) déjà sauvée dans le dossier. reuse: retourne le fichier existant. hardlink: crée le nouveau nom comme lien physique vers l'existant (pas d'espace disque en plus)."
+                }),
             },
             "hidden": {
                 "prompt": "PROMPT",
@@ -138,7 +164,7 @@ class TOOSmartImageSaver:
 
     def save_images(self, images, output_folder, prefix, extra1, extra2, model, suffix,
                    output_format, webp_lossless, quality, separator, embed_workflow, save_metadata,
-                   metadata=None, workflow=None, prompt=None, extra_pnginfo=None):
+                   metadata=None, workflow=None, compression_profile=DEFAULT_PROFILE, compress_workflow=False, async_save=False, perf_log="", dedup="off", prompt=None, extra_pnginfo=None):
         
         now = datetime.now()
         
@@ -191,182 +217,170 @@ class TOOSmartImageSaver:
         # Nettoyer le nom de fichier des caractères invalides
         filename_base = self._safe_path(filename_base) if filename_base else filename_base
         
+        perf_log = resolve_perf_log(folder_paths.get_output_directory(), perf_log)
+        timings = SaveTimings("TOOSmartImageSaver", len(images), perf_log)
+        
         # Préparer les métadonnées A1111 si fournies et si save_metadata activé
+        t0 = time.perf_counter()
         a111_params = None
         if save_metadata and metadata and isinstance(metadata, dict):
             width, height = self._get_image_dimensions(images[0])
             a111_params = self._build_a111_params(metadata, width, height)
         
+        # Métadonnées sérialisées une seule fois pour tout le batch
+        save_meta = None
+        if not args.disable_metadata:
+            wf_extra_pnginfo, wf_prompt = None, None
+            if embed_workflow:
+                wf_extra_pnginfo, wf_prompt = select_workflow_source(workflow, prompt, extra_pnginfo)
+            save_meta = SaveMetadata(output_format, a111_params, wf_extra_pnginfo, wf_prompt,
+                                     compress=compress_workflow)
+        timings.batch_stage("metadata_ms", t0)
+        
         # Sauvegarder toutes les images
+        writer = get_writer() if async_save else None
+        allocator = get_allocator()
+        # Images géantes en PNG : écriture en flux par bandes, sans copie complète
+        stream_png = output_format == "png" and images.shape[-3] * images.shape[-2] >= STREAM_MIN_PIXELS
+        pixels = None
+        if not stream_png:
+            # Conversion uint8 de tout le batch en une fois (une seule synchro device)
+            t0 = time.perf_counter()
+            pixels = tensor_batch_to_uint8(images)
+            timings.batch_stage("convert_ms", t0)
+        dedup_index = get_dedup_index() if dedup in ("reuse", "hardlink") and not stream_png else None
         saved_paths = []
         for i, image in enumerate(images):
             # Ajouter un compteur si plusieurs images
             if len(images) > 1:
                 filename = f"{filename_base}_{i:04d}.{output_format}"
+                counter_stem = f"{filename_base}_{i:04d}"
             else:
                 filename = f"{filename_base}.{output_format}"
+                counter_stem = filename_base
             
-            filepath = os.path.join(output_dir, filename)
+            # Déduplication : image identique déjà présente dans le dossier ?
+            dedup_key, existing = None, None
+            if dedup_index:
+                t0 = time.perf_counter()
+                dedup_key = content_key(pixels[i], output_format, webp_lossless, quality,
+                                        compression_profile, a111_params)
+                existing = dedup_index.lookup(output_dir, dedup_key)
+                hash_ms = elapsed_ms(t0)
+                if existing and dedup == "reuse":
+                    record = timings.new_record(existing)
+                    record.update({"hash_ms": hash_ms, "dedup": "reuse"})
+                    timings.finish(record)
+                    print(f"♻️ Image identique déjà sauvegardée: {existing}")
+                    saved_paths.append(existing)
+                    continue
             
-            # S'assurer que le fichier n'existe pas déjà (ajouter un compteur)
-            counter = 1
-            while os.path.exists(filepath):
-                if len(images) > 1:
-                    filename = f"{filename_base}_{i:04d}_{counter:03d}.{output_format}"
-                else:
-                    filename = f"{filename_base}_{counter:03d}.{output_format}"
-                filepath = os.path.join(output_dir, filename)
-                counter += 1
+            # Réserver le nom atomiquement (compteur _001, _002... si déjà pris)
+            filepath = allocator.reserve(output_dir, filename, counter_stem, output_format)
             
-            # Convertir tensor en image PIL
-            img = self._tensor_to_pil(image)
+            record = timings.new_record(filepath)
+            if dedup_key:
+                record["hash_ms"] = hash_ms
+            if existing:
+                try:
+                    hardlink_to(existing, filepath)
+                    record["dedup"] = "hardlink"
+                    timings.finish(record)
+                    print(f"🔗 Image identique liée: {filepath} -> {existing}")
+                    saved_paths.append(filepath)
+                    continue
+                except OSError as e:
+                    # FS sans hardlinks (FAT, partage réseau...) : écriture normale
+                    print(f"⚠️ Hardlink impossible ({e}), écriture normale")
             
-            # Sauvegarder selon le format
-            if output_format == "png":
-                self._save_png(img, filepath, a111_params, prompt, extra_pnginfo, embed_workflow, workflow)
-            elif output_format in ["webp", "jpg", "jpeg"]:
-                self._save_webp_jpeg(img, filepath, output_format, webp_lossless, quality, 
-                                    a111_params, prompt, extra_pnginfo, embed_workflow, workflow)
+            if stream_png:
+                # Toujours synchrone : le but est la mémoire, pas la latence
+                self._write_png_stream(image, filepath, compression_profile, save_meta, timings, record)
+                print(f"💾 Image sauvegardée (PNG en flux): {filepath}")
+                saved_paths.append(filepath)
+                continue
+            
+            # Image PIL construite ici : le thread d'écriture ne référence pas le tensor
+            t0 = time.perf_counter()
+            img = Image.fromarray(pixels[i])
+            record["convert_ms"] = round(record.get("convert_ms", 0) + elapsed_ms(t0), 3)
+            
+            write_args = (img, filepath, output_format, webp_lossless, quality, compression_profile,
+                          save_meta, timings, record, (output_dir, dedup_key) if dedup_key else None)
+            if writer:
+                writer.submit(filepath, self._write_image, *write_args)
+                print(f"💾 Image en cours de sauvegarde: {filepath}")
+            else:
+                self._write_image(*write_args)
+                print(f"💾 Image sauvegardée: {filepath}")
             
             saved_paths.append(filepath)
-            print(f"💾 Image sauvegardée: {filepath}")
         
-        # Retourner les images et le chemin du premier fichier
-        return (images, saved_paths[0] if saved_paths else "")
+        # Retourner les images et le chemin du premier fichier (+ temps par étape pour l'UI)
+        return {"ui": timings.ui(), "result": (images, saved_paths[0] if saved_paths else "")}
     
-    def _save_png(self, img, filepath, a111_params, prompt, extra_pnginfo, embed_workflow, workflow):
-        """Sauvegarde une image PNG avec métadonnées"""
-        from PIL import PngImagePlugin
-        
-        if args.disable_metadata:
-            img.save(filepath)
-            return
-        
-        metadata = PngImagePlugin.PngInfo()
-        
-        # Ajouter les paramètres A1111 dans "parameters"
-        if a111_params:
-            metadata.add_text("parameters", a111_params)
-        
-        # Ajouter le workflow ComfyUI si demandé
-        if embed_workflow:
-            # Si workflow est fourni en entrée, l'utiliser en priorité
-            if workflow and isinstance(workflow, dict):
-                wf_extra_pnginfo = workflow.get("extra_pnginfo")
-                wf_prompt = workflow.get("prompt")
-                
-                if wf_extra_pnginfo is not None:
-                    for k, v in wf_extra_pnginfo.items():
-                        metadata.add_text(k, json.dumps(v))
-                
-                if wf_prompt is not None:
-                    metadata.add_text("prompt", json.dumps(wf_prompt))
-            else:
-                # Sinon, utiliser le workflow courant
-                if extra_pnginfo is not None:
-                    for k, v in extra_pnginfo.items():
-                        metadata.add_text(k, json.dumps(v))
-                
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
+    def _write_image(self, img, filepath, output_format, webp_lossless, quality, compression_profile,
+                     save_meta, timings, record, dedup_entry=None):
+        """Encode et écrit une image selon le format (appelé directement ou depuis le pool)"""
+        try:
+            if output_format == "png":
+                self._save_png(img, filepath, compression_profile, save_meta, record)
+            elif output_format in ["webp", "jpg", "jpeg"]:
+                self._save_webp_jpeg(img, filepath, output_format, webp_lossless, quality,
+                                     compression_profile, save_meta, record)
+        except Exception:
+            # Ne pas laisser de fichier réservé vide derrière nous
+            get_allocator().release(filepath)
+            raise
+        if dedup_entry:
+            # Indexé seulement une fois le fichier complet sur disque
+            get_dedup_index().add(dedup_entry[0], dedup_entry[1], filepath)
+        timings.finish(record)
+    
+    def _write_png_stream(self, image, filepath, compression_profile, save_meta, timings, record):
+        """Écrit un PNG géant bande par bande directement depuis le tensor [H, W, C]"""
+        height, width, channels = (int(d) for d in image.shape)
+        bands = iter_uint8_bands(image, band_rows(width, channels))
+        t0 = time.perf_counter()
+        try:
+            record["bytes"] = write_png_stream(
+                filepath, width, height, channels, bands,
+                compress_level=encoder_kwargs("png", compression_profile)["compress_level"],
+                pnginfo=save_meta.pnginfo if save_meta else None,
+            )
+        except Exception:
+            # Fichier partiel : on le supprime plutôt que de laisser un PNG tronqué
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            raise
+        # Conversion, encodage et écriture sont entrelacés : une seule mesure
+        record["stream_ms"] = elapsed_ms(t0)
+        timings.finish(record)
+    
+    def _save_png(self, img, filepath, compression_profile, save_meta, record=None):
+        """Sauvegarde une image PNG avec métadonnées (chunks texte pré-construits)"""
+        save_kwargs = encoder_kwargs("png", compression_profile)
+        if save_meta is not None:
+            save_kwargs["pnginfo"] = save_meta.pnginfo
         
-        img.save(filepath, pnginfo=metadata)
+        encode_and_write(img, filepath, "png", record, **save_kwargs)
     
-    def _save_webp_jpeg(self, img, filepath, output_format, webp_lossless, quality, 
-                       a111_params, prompt, extra_pnginfo, embed_workflow, workflow):
-        """Sauvegarde une image WEBP ou JPEG avec métadonnées EXIF"""
-        # Sauvegarder l'image d'abord
-        if output_format == "webp":
-            # method 6 n'apporte quasiment rien vs 4 en lossless (même taille,
-            # vérifié) mais coûte ~10x le temps d'encodage - lossy reste à 6
-            # (peu coûteux là, et ça aide vraiment la taille du fichier).
-            webp_method = 4 if webp_lossless else 6
-            img.save(filepath, lossless=webp_lossless, quality=quality, method=webp_method)
-        else:  # jpg/jpeg
-            img.save(filepath, quality=quality)
-        
-        # Ajouter les métadonnées EXIF si non désactivé
-        if args.disable_metadata:
-            return
-        
-        # Construire le dictionnaire EXIF
-        pnginfo_json = {}
-        prompt_json = {}
-        
-        # Workflow ComfyUI dans Make/Model tags si demandé
-        if embed_workflow:
-            # Si workflow est fourni en entrée, l'utiliser en priorité
-            if workflow and isinstance(workflow, dict):
-                wf_extra_pnginfo = workflow.get("extra_pnginfo")
-                wf_prompt = workflow.get("prompt")
-                
-                if wf_extra_pnginfo is not None:
-                    pnginfo_json = {
-                        piexif.ImageIFD.Make - i: f"{k}:{json.dumps(v, separators=(',', ':'))}" 
-                        for i, (k, v) in enumerate(wf_extra_pnginfo.items())
-                    }
-                
-                if wf_prompt is not None:
-                    prompt_json = {
-                        piexif.ImageIFD.Model: f"prompt:{json.dumps(wf_prompt, separators=(',', ':'))}"
-                    }
-            else:
-                # Sinon, utiliser le workflow courant
-                if extra_pnginfo is not None:
-                    pnginfo_json = {
-                        piexif.ImageIFD.Make - i: f"{k}:{json.dumps(v, separators=(',', ':'))}" 
-                        for i, (k, v) in enumerate(extra_pnginfo.items())
-                    }
-                
-                if prompt is not None:
-                    prompt_json = {
-                        piexif.ImageIFD.Model: f"prompt:{json.dumps(prompt, separators=(',', ':'))}"
-                    }
-        
-        # Construire le dictionnaire EXIF complet
-        exif_dict = {}
-        
-        # Section "0th" pour workflow
-        if pnginfo_json or prompt_json:
-            exif_dict["0th"] = pnginfo_json | prompt_json
-        
-        # Section "Exif" pour les paramètres A1111
-        if a111_params:
-            exif_dict["Exif"] = {
-                piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(
-                    a111_params, 
-                    encoding="unicode"
-                )
-            }
-        
-        # Générer et insérer les données EXIF
-        if exif_dict:
-            exif_bytes = piexif.dump(exif_dict)
-            
-            # Vérifier la taille pour JPEG
-            if output_format in ["jpg", "jpeg"]:
-                MAX_EXIF_SIZE = 65535
-                if len(exif_bytes) > MAX_EXIF_SIZE:
-                    print(f"⚠️ TOO Smart Image Saver: Métadonnées trop volumineuses ({len(exif_bytes)} bytes) pour JPEG (max {MAX_EXIF_SIZE})")
-                    # Essayer sans le workflow
-                    exif_dict_minimal = {}
-                    if a111_params:
-                        exif_dict_minimal["Exif"] = {
-                            piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(
-                                a111_params, 
-                                encoding="unicode"
-                            )
-                        }
-                    if exif_dict_minimal:
-                        exif_bytes = piexif.dump(exif_dict_minimal)
-                        if len(exif_bytes) <= MAX_EXIF_SIZE:
-                            piexif.insert(exif_bytes, filepath)
-                            print("   → Métadonnées A1111 sauvegardées (workflow omis)")
-                        else:
-                            print("   → Impossible de sauvegarder les métadonnées")
-                    return
-            
-            piexif.insert(exif_bytes, filepath)
+    def _save_webp_jpeg(self, img, filepath, output_format, webp_lossless, quality,
+                        compression_profile, save_meta, record=None):
+        """Sauvegarde une image WEBP ou JPEG avec métadonnées EXIF (une seule écriture)"""
+        # method WEBP, optimize/progressive/subsampling JPEG selon le profil
+        save_kwargs = encoder_kwargs(output_format, compression_profile, quality,
+                                     lossless=webp_lossless and output_format == "webp")
+        
+        # L'EXIF est construit avant l'encodage et passé directement à Pillow,
+        # pas besoin de relire/réécrire le fichier avec piexif.insert
+        exif_bytes = save_meta.exif if save_meta else None
+        if exif_bytes:
+            save_kwargs["exif"] = exif_bytes
+        
+        encode_and_write(img, filepath, output_format, record, **save_kwargs)
     
     def _build_a111_params(self, metadata, width, height):
         """
@@ -502,12 +516,6 @@ class TOOSmartImageSaver:
         
         # Sinon, on retourne le nom complet (peut-être que ce n'était pas vraiment une extension de modèle)
         return model_name
-    
-    def _tensor_to_pil(self, tensor):
-        """Convertit un tensor ComfyUI en image PIL"""
-        # tensor shape: [H, W, C] avec valeurs 0-1
-        img_array = (tensor.cpu().numpy() * 255).astype(np.uint8)
-        return Image.fromarray(img_array)
 
 
 NODE_CLASS_MAPPINGS = {
@@ -1,14 +1,23 @@
 import os
-import json
-import numpy as np
 from PIL import Image
-from PIL.PngImagePlugin import PngInfo
 import folder_paths
 from datetime import datetime
-import piexif
-import piexif.helper
 from comfy.cli_args import args
-import hashlib
+import time
+
+from .encoder_profiles import DEFAULT_PROFILE, encoder_kwargs
+from .filename_allocator import get_allocator
+from .image_convert import iter_uint8_bands, tensor_batch_to_uint8
+from .model_hashes import file_autov3, file_sha256, get_hash_pool
+from .model_paths import resolve_model_path
+from .naming_templates import compile_template, render_date_tokens
+from .png_stream import STREAM_MIN_PIXELS, band_rows, write_png_stream
+from .replace_engine import compile_replace_pairs
+from .save_dedup import content_key, get_dedup_index, hardlink_to
+from .save_metadata import SaveMetadata, select_workflow_source
+from .save_timing import SaveTimings, elapsed_ms, encode_and_write, resolve_perf_log
+from .workflow_index import get_workflow_index
+from ..utils.prompt_index import get_prompt_index
 
 class FileNaming:
     def __init__(self):
@@ -46,22 +55,7 @@ class FileNaming:
             return text
         if now is None:
             now = datetime.now()
-        if 'timestamp' in text:
-            text = text.replace('timestamp', str(int(now.timestamp())))
-
-        replacements = {
-            "YYYY": now.strftime("%Y"),
-            "YY": now.strftime("%y"),
-            "MM": now.strftime("%m"),
-            "DD": now.strftime("%d"),
-            "HH": now.strftime("%H"),
-            "mm": now.strftime("%M"),
-            "ss": now.strftime("%S")
-        }
-
-        for token, value in replacements.items():
-            text = text.replace(token, value)
-        return text
+        return render_date_tokens(text, now)
 
     def _safe_path(self, path):
         if not path:
@@ -77,65 +71,29 @@ class FileNaming:
     
     def _calculate_file_hash(self, filepath, hash_length=12):
         try:
-            possible_paths = []
-            if os.path.isfile(filepath):
-                possible_paths.append(filepath)
-            else:
-                checkpoints_dir = folder_paths.get_folder_paths("checkpoints")
-                for cp_dir in checkpoints_dir:
-                    full_path = os.path.join(cp_dir, filepath)
-                    if os.path.isfile(full_path):
-                        possible_paths.append(full_path)
-                loras_dir = folder_paths.get_folder_paths("loras")
-                for lora_dir in loras_dir:
-                    full_path = os.path.join(lora_dir, filepath)
-                    if os.path.isfile(full_path):
-                        possible_paths.append(full_path)
-            if not possible_paths:
+            # One dict lookup across all checkpoints/loras roots (rebuilt on directory mtime change)
+            actual_path = resolve_model_path(filepath)
+            if not actual_path:
                 return ""
-            actual_path = possible_paths[0]
-            sha256_hash = hashlib.sha256()
-            with open(actual_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()[:hash_length]
+            # Persistent index: only re-hashed when size/mtime change
+            return file_sha256(actual_path)[:hash_length]
         except Exception as e:
             print(f"Warning: Could not calculate hash for {filepath}: {e}")
             return ""
 
-    def _calculate_lora_hash(self, filepath):
+    def _calculate_lora_hash(self, filepath, trust_embedded=False):
         """
         Calculate SHA256 hash of a lora file excluding safetensors metadata (compatible A1111/Civitai AutoV3).
         Returns first 12 characters of the hash.
+        With trust_embedded, a hash stored in the safetensors header (sshs_model_hash...) is used as-is:
+        only its format is checked, never its value against the file contents.
         """
         try:
-            possible_paths = []
-            if os.path.isfile(filepath):
-                possible_paths.append(filepath)
-            else:
-                checkpoints_dir = folder_paths.get_folder_paths("checkpoints")
-                for cp_dir in checkpoints_dir:
-                    full_path = os.path.join(cp_dir, filepath)
-                    if os.path.isfile(full_path):
-                        possible_paths.append(full_path)
-                loras_dir = folder_paths.get_folder_paths("loras")
-                for lora_dir in loras_dir:
-                    full_path = os.path.join(lora_dir, filepath)
-                    if os.path.isfile(full_path):
-                        possible_paths.append(full_path)
-            if not possible_paths:
+            # One dict lookup across all checkpoints/loras roots (rebuilt on directory mtime change)
+            actual_path = resolve_model_path(filepath)
+            if not actual_path:
                 return ""
-            actual_path = possible_paths[0]
-            hash_sha256 = hashlib.sha256()
-            blksize = 1024 * 1024
-            with open(actual_path, "rb") as f:
-                header = f.read(8)
-                n = int.from_bytes(header, "little")
-                offset = n + 8
-                f.seek(offset)
-                for chunk in iter(lambda: f.read(blksize), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()[:12]
+            return file_autov3(actual_path, trust_embedded)[:12]
         except Exception as e:
             print(f"Warning: Could not calculate lora hash for {filepath}: {e}")
             return ""
@@ -228,8 +186,8 @@ class FileNaming:
             node_id = pattern_without_hash[:last_colon_idx]
             widget_name = pattern_without_hash[last_colon_idx + 1:]
 
-            if node_id in prompt:
-                node_data = prompt[node_id]
+            node_data = get_prompt_index(prompt).node(node_id)
+            if node_data is not None:
                 inputs = node_data.get("inputs", {})
                 value = inputs.get(widget_name, "")
                 if isinstance(value, str) and '\n' in value:
@@ -246,27 +204,24 @@ class FileNaming:
             class_search = parts[0].lower()
             widget_name = parts[1]
 
-            for node_id in prompt:
-                node_data = prompt[node_id]
-                class_type = node_data.get("class_type", "")
-
-                if class_search in class_type.lower():
-                    inputs = node_data.get("inputs", {})
-                    value = inputs.get(widget_name, "")
-                    if isinstance(value, str) and '\n' in value:
-                        lines = [line.strip() for line in value.split('\n') if line.strip()]
-                        return lines if lines else ""
-                    return str(value) if value else ""
+            # First node (prompt order) whose class_type contains the search, via the shared index
+            for node_id, node_data in get_prompt_index(prompt).nodes_by_class(class_search):
+                inputs = node_data.get("inputs", {})
+                value = inputs.get(widget_name, "")
+                if isinstance(value, str) and '\n' in value:
+                    lines = [line.strip() for line in value.split('\n') if line.strip()]
+                    return lines if lines else ""
+                return str(value) if value else ""
             return ""
 
     def resolve_template_value(self, value, prompt, meta_dict, date_vars, any_values):
-        if not value or "{" not in value:
+        if not value:
             return self._resolve_simple(value, prompt, meta_dict, date_vars, any_values)
-        
-        import re
-        return re.sub(r'\{([^}]+)\}', 
-                      lambda m: self._resolve_token(m.group(1).strip(), prompt, meta_dict, date_vars, any_values) or m.group(0), 
-                      value)
+        # Parsed once per template string, then only evaluated
+        template = compile_template(value)
+        if template.simple:
+            return self._resolve_simple(value, prompt, meta_dict, date_vars, any_values)
+        return template.render(lambda token: self._resolve_token(token, prompt, meta_dict, date_vars, any_values))
 
     def _resolve_simple(self, value, prompt, meta_dict, date_vars, any_values):
         if not value:
@@ -314,25 +269,27 @@ class FileNaming:
     def resolve_for_metadata(self, value, prompt, meta_dict, date_vars, any_values):
         if not value:
             return ""
-        import re
-        match = re.search(r'\{([^}]+)\}', value)
-        if match:
-            return self._resolve_token(match.group(1).strip(), prompt, meta_dict, date_vars, any_values) or ""
+        token = compile_template(value).first_token
+        if token is not None:
+            return self._resolve_token(token, prompt, meta_dict, date_vars, any_values) or ""
         return self._resolve_simple(value, prompt, meta_dict, date_vars, any_values)
     
     def resolve_for_metadata_raw(self, value, prompt, meta_dict, date_vars, any_values):
         if not value:
             return None
-        import re
-        match = re.search(r'\{([^}]+)\}', value)
-        if match:
-            return self._resolve_token_raw(match.group(1).strip(), prompt, meta_dict, date_vars, any_values)
+        token = compile_template(value).first_token
+        if token is not None:
+            return self._resolve_token_raw(token, prompt, meta_dict, date_vars, any_values)
         v = value.strip()
         return self._resolve_token_raw(v, prompt, meta_dict, date_vars, any_values)
 
-    def save_images(self, images, metadata=None, workflow=None, any1=None, any2=None, any3=None, prompt=None, extra_pnginfo=None, unique_id=None):
-        config = self._get_config(extra_pnginfo, unique_id)
-
+    def resolve_naming(self, config, prompt, metadata=None, any1=None, any2=None, any3=None, now=None, compute_hashes=True):
+        """
+        Resolve metadata fields and the output folder/filename from a node config.
+        Shared by save_images and the /too/naming/preview route (compute_hashes=False:
+        no model/LoRA file is read). Does not create any directory.
+        """
+        prompt = prompt or {}
         any1_value = str(any1).strip() if any1 is not None else ""
         any2_value = str(any2).strip() if any2 is not None else ""
         any3_value = str(any3).strip() if any3 is not None else ""
@@ -343,7 +300,8 @@ class FileNaming:
             "[any3]": any3_value
         }
 
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         date_vars = {
             "%date1": self._parse_date_tokens(config.get("date1", ""), now),
             "%date2": self._parse_date_tokens(config.get("date2", ""), now),
@@ -388,7 +346,7 @@ class FileNaming:
                         meta_dict["model_name"] = model_name
                         naming_dict["model_name"] = model_name
                     
-                    if "model_hash" not in meta_dict:
+                    if compute_hashes and "model_hash" not in meta_dict:
                         model_hash = self._calculate_file_hash(str(model_value), 10)
                         if model_hash:
                             meta_dict["model_hash"] = model_hash
@@ -406,13 +364,18 @@ class FileNaming:
                 
                 lora_values = lora_value if isinstance(lora_value, list) else [lora_value] if lora_value else []
                 
-                for lora_val in lora_values:
-                    if lora_val:
-                        lora_name = os.path.splitext(os.path.basename(str(lora_val)))[0]
-                        lora_names.append(lora_name)
-                        lora_hash = self._calculate_lora_hash(str(lora_val))
-                        if lora_hash:
-                            lora_hashes_dict[lora_name] = lora_hash
+                lora_values = [str(v) for v in lora_values if v]
+                # Hash all LoRAs of this extract in parallel, keeping their order
+                trust_embedded = bool(config.get("trust_embedded_hashes", False))
+                if compute_hashes:
+                    lora_hashes = get_hash_pool().map(lambda v: self._calculate_lora_hash(v, trust_embedded), lora_values)
+                else:
+                    lora_hashes = [""] * len(lora_values)
+                for lora_val, lora_hash in zip(lora_values, lora_hashes):
+                    lora_name = os.path.splitext(os.path.basename(lora_val))[0]
+                    lora_names.append(lora_name)
+                    if lora_hash:
+                        lora_hashes_dict[lora_name] = lora_hash
 
         if lora_names:
             meta_dict["loras"] = ", ".join(lora_names)
@@ -425,33 +388,11 @@ class FileNaming:
             meta_dict["lora_hashes"] = lora_hashes_dict
             naming_dict["lora_hashes"] = lora_hashes_dict
 
-        replacements = config.get("text_replace_pairs", [])
-        for pair in replacements:
-            target = pair.get("target", "")
-            input_str = pair.get("input", "")
-            output_str = pair.get("output", "")
-
-            if not input_str:
-                continue
-
-            if target in any_values:
-                target = ""
-            
-            if target and target in meta_dict:
-                value = str(meta_dict[target])
-                meta_dict[target] = value.replace(input_str, output_str)
-            elif not target:
-                for key in meta_dict:
-                    value = str(meta_dict[key])
-                    meta_dict[key] = value.replace(input_str, output_str)
-            
-            if target and target in naming_dict:
-                value = str(naming_dict[target])
-                naming_dict[target] = value.replace(input_str, output_str)
-            elif not target:
-                for key in naming_dict:
-                    value = str(naming_dict[key])
-                    naming_dict[key] = value.replace(input_str, output_str)
+        # All replace pairs compiled into one single-pass engine (cached per config)
+        replace_engine = compile_replace_pairs(config.get("text_replace_pairs", []), any_values)
+        if replace_engine.rules:
+            replace_engine.apply_dict(meta_dict)
+            replace_engine.apply_dict(naming_dict)
 
         filename_parts = []
         separator = config.get("separator", "_")
@@ -471,19 +412,69 @@ class FileNaming:
             else:
                 filename_parts.append(resolved)
 
-        output_dir = self.output_dir
         if output_folder:
             output_folder = self._safe_path(output_folder)
-            output_dir = os.path.join(output_dir, output_folder)
-            os.makedirs(output_dir, exist_ok=True)
 
         filename_base = separator.join(filename_parts) if filename_parts else "output"
         filename_base = self._safe_path(filename_base)
 
+        return {
+            "meta_dict": meta_dict,
+            "naming_dict": naming_dict,
+            "output_folder": output_folder,
+            "filename_base": filename_base,
+        }
+
+    def save_images(self, images, metadata=None, workflow=None, any1=None, any2=None, any3=None, prompt=None, extra_pnginfo=None, unique_id=None):
+        config = self._get_config(extra_pnginfo, unique_id)
+        naming = self.resolve_naming(config, prompt, metadata, any1, any2, any3)
+        meta_dict = naming["meta_dict"]
+        output_folder = naming["output_folder"]
+        filename_base = naming["filename_base"]
+
+        output_dir = self.output_dir
+        if output_folder:
+            output_dir = os.path.join(output_dir, output_folder)
+            os.makedirs(output_dir, exist_ok=True)
+
         output_format = config.get("output_format", "webp")
         quality = config.get("quality", 95)
         embed_workflow = config.get("embed_workflow", True)
         save_metadata = config.get("save_metadata", True)
+        compress_workflow = config.get("compress_workflow", False)
+        compression_profile = config.get("compression_profile", DEFAULT_PROFILE)
+        perf_log = config.get("perf_log", "")
+        dedup = config.get("dedup", "off")
+        perf_log = resolve_perf_log(self.output_dir, perf_log)
+        timings = SaveTimings("FileNaming", len(images), perf_log)
+
+        t0 = time.perf_counter()
+        a111_params = None
+        if save_metadata and meta_dict:
+            width, height = self._get_image_dimensions(images[0])
+            a111_params = self._build_a111_params(meta_dict, width, height)
+
+        # Workflow/prompt JSON serialized once for the whole batch
+        save_meta = None
+        if not args.disable_metadata:
+            wf_extra_pnginfo, wf_prompt = None, None
+            if embed_workflow:
+                wf_extra_pnginfo, wf_prompt = select_workflow_source(workflow, prompt, extra_pnginfo)
+            try:
+                save_meta = SaveMetadata(output_format, a111_params, wf_extra_pnginfo, wf_prompt, compress=compress_workflow)
+            except Exception as e:
+                print(f"Could not build metadata: {e}")
+        timings.batch_stage("metadata_ms", t0)
+
+        # Huge PNGs (big grids) are streamed in row bands instead of a full uint8 copy
+        stream_png = output_format == "png" and images.shape[-3] * images.shape[-2] >= STREAM_MIN_PIXELS
+        pixels = None
+        if not stream_png:
+            t0 = time.perf_counter()
+            pixels = tensor_batch_to_uint8(images)
+            timings.batch_stage("convert_ms", t0)
+        allocator = get_allocator()
+        dedup_index = get_dedup_index() if dedup in ("reuse", "hardlink") and not stream_png else None
 
         saved_paths = []
         for i, image in enumerate(images):
@@ -492,53 +483,62 @@ class FileNaming:
             else:
                 filename = f"{filename_base}.{output_format}"
 
-            filepath = os.path.join(output_dir, filename)
-
-            counter = 1
-            while os.path.exists(filepath):
-                filename = f"{filename_base}_{counter:03d}.{output_format}"
-                filepath = os.path.join(output_dir, filename)
-                counter += 1
-
-            i_np = 255. * image.cpu().numpy()
-            img = Image.fromarray(np.clip(i_np, 0, 255).astype(np.uint8))
+            # Content dedup: skip encode/write if identical pixels were already saved here
+            dedup_key, existing = None, None
+            if dedup_index:
+                t0 = time.perf_counter()
+                dedup_key = content_key(pixels[i], output_format, quality, compression_profile, a111_params)
+                existing = dedup_index.lookup(output_dir, dedup_key)
+                hash_ms = elapsed_ms(t0)
+                if existing and dedup == "reuse":
+                    record = timings.new_record(existing)
+                    record.update({"hash_ms": hash_ms, "dedup": "reuse"})
+                    timings.finish(record)
+                    print(f"Identical image already saved: {existing}")
+                    saved_paths.append(existing)
+                    continue
+
+            # Atomic O_EXCL reservation, falls back to {base}_001, _002...
+            filepath = allocator.reserve(output_dir, filename, filename_base, output_format)
+
+            record = timings.new_record(filepath)
+            if dedup_key:
+                record["hash_ms"] = hash_ms
+            if existing:
+                try:
+                    hardlink_to(existing, filepath)
+                    record["dedup"] = "hardlink"
+                    timings.finish(record)
+                    saved_paths.append(filepath)
+                    continue
+                except OSError as e:
+                    print(f"Hardlink failed ({e}), writing normally")
+
+            if stream_png:
+                self._write_png_stream(image, filepath, compression_profile, save_meta, record)
+                timings.finish(record)
+                saved_paths.append(filepath)
+                continue
 
-            a111_params = None
-            if save_metadata and meta_dict:
-                width, height = self._get_image_dimensions(image)
-                a111_params = self._build_a111_params(meta_dict, width, height)
+            t0 = time.perf_counter()
+            img = Image.fromarray(pixels[i])
+            record["convert_ms"] = round(record.get("convert_ms", 0) + elapsed_ms(t0), 3)
 
-            if output_format == "png":
-                self._save_png(img, filepath, a111_params, workflow, prompt, extra_pnginfo, embed_workflow)
-            else:
-                self._save_webp_jpeg(img, filepath, output_format, quality, a111_params, workflow, prompt, extra_pnginfo, embed_workflow)
+            try:
+                if output_format == "png":
+                    self._save_png(img, filepath, compression_profile, save_meta, record)
+                else:
+                    self._save_webp_jpeg(img, filepath, output_format, quality, compression_profile, save_meta, record)
+            except Exception:
+                allocator.release(filepath)
+                raise
+            if dedup_key:
+                dedup_index.add(output_dir, dedup_key, filepath)
+            timings.finish(record)
 
             saved_paths.append(filepath)
 
-        return (images, saved_paths[0] if saved_paths else "")
-
-    def _find_node_recursive(self, nodes, unique_id=None, definitions=None):
-        if unique_id is not None:
-            uid = str(unique_id).rsplit(":", 1)[-1]  # '8742:8751' → '8751'
-        else:
-            uid = None
-
-        for node in nodes:
-            if uid and str(node.get("id", "")) == uid:
-                return node
-            subgraph = node.get("subgraph") or node.get("data", {}).get("subgraph")
-            if subgraph:
-                found = self._find_node_recursive(subgraph.get("nodes", []), unique_id, definitions)
-                if found:
-                    return found
-
-        if definitions:
-            for sg in definitions.get("subgraphs", []):
-                found = self._find_node_recursive(sg.get("nodes", []), unique_id)
-                if found:
-                    return found
-
-        return None
+        return {"ui": timings.ui(), "result": (images, saved_paths[0] if saved_paths else "")}
 
     def _get_config(self, extra_pnginfo, unique_id=None):
         config = {
@@ -547,6 +547,11 @@ class FileNaming:
             "quality": 95,
             "embed_workflow": True,
             "save_metadata": True,
+            "compress_workflow": False,
+            "compression_profile": DEFAULT_PROFILE,
+            "perf_log": "",
+            "dedup": "off",
+            "trust_embedded_hashes": False,
             "date1": "YYYY-MM-DD",
             "date2": "YYYY-MM-DD_HHmmss",
             "date3": "HHmmss",
@@ -558,127 +563,61 @@ class FileNaming:
 
         if extra_pnginfo and "workflow" in extra_pnginfo:
             try:
-                wf = json.loads(extra_pnginfo["workflow"]) if isinstance(extra_pnginfo["workflow"], str) else extra_pnginfo["workflow"]
-                nodes = wf.get("nodes", [])
-                definitions = wf.get("definitions", {})
-                target_node = self._find_node_recursive(nodes, unique_id, definitions)
+                # Parsed/walked once per workflow, then an O(1) lookup
+                target_node = get_workflow_index(extra_pnginfo["workflow"]).find(unique_id)
                 if target_node:
-                    config.update(target_node.get("properties", {}))
-                    config["text_replace_pairs"] = target_node.get("text_replace_pairs", [])
-                    config["data_fields"] = target_node.get("data_fields", [])
+                    self._apply_node_config(config, target_node)
             except Exception as e:
                 pass
 
         return config
 
-    def _save_png(self, img, filepath, a111_params, workflow, prompt, extra_pnginfo, embed_workflow):
-        if args.disable_metadata:
-            img.save(filepath)
-            return
-
-        pnginfo = PngInfo()
-
-        if a111_params:
-            pnginfo.add_text("parameters", a111_params)
-
-        if embed_workflow:
-            if workflow and isinstance(workflow, dict):
-                wf_extra = workflow.get("extra_pnginfo")
-                wf_prompt = workflow.get("prompt")
-                if wf_extra:
-                    for k, v in wf_extra.items():
-                        pnginfo.add_text(k, json.dumps(v) if not isinstance(v, str) else v)
-                if wf_prompt:
-                    pnginfo.add_text("prompt", json.dumps(wf_prompt))
-            else:
-                if extra_pnginfo:
-                    for k, v in extra_pnginfo.items():
-                        pnginfo.add_text(k, json.dumps(v) if not isinstance(v, str) else v)
-                if prompt:
-                    pnginfo.add_text("prompt", json.dumps(prompt))
-
-        img.save(filepath, pnginfo=pnginfo)
-
-    def _save_webp_jpeg(self, img, filepath, output_format, quality, a111_params, workflow, prompt, extra_pnginfo, embed_workflow):
-        if output_format == "webp":
-            img.save(filepath, quality=quality, method=6)
-        else:
-            img.save(filepath, quality=quality)
+    def config_from_node(self, node):
+        """Config of a serialized FileNaming node (workflow JSON), with defaults"""
+        config = self._get_config(None)
+        if node:
+            self._apply_node_config(config, node)
+        return config
 
-        if args.disable_metadata:
-            return
+    def _apply_node_config(self, config, node):
+        config.update(node.get("properties", {}))
+        config["text_replace_pairs"] = node.get("text_replace_pairs", [])
+        config["data_fields"] = node.get("data_fields", [])
 
-        pnginfo_json = {}
-        prompt_json = {}
+    def _write_png_stream(self, image, filepath, compression_profile, save_meta, record):
+        height, width, channels = (int(d) for d in image.shape)
+        bands = iter_uint8_bands(image, band_rows(width, channels))
+        t0 = time.perf_counter()
+        try:
+            record["bytes"] = write_png_stream(
+                filepath, width, height, channels, bands,
+                compress_level=encoder_kwargs("png", compression_profile)["compress_level"],
+                pnginfo=save_meta.pnginfo if save_meta else None,
+            )
+        except Exception:
+            # Don't leave a truncated PNG behind
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            raise
+        record["stream_ms"] = elapsed_ms(t0)
 
-        if embed_workflow:
-            if workflow and isinstance(workflow, dict):
-                wf_extra_pnginfo = workflow.get("extra_pnginfo")
-                wf_prompt = workflow.get("prompt")
+    def _save_png(self, img, filepath, compression_profile, save_meta, record=None):
+        save_kwargs = encoder_kwargs("png", compression_profile)
+        if save_meta is not None:
+            save_kwargs["pnginfo"] = save_meta.pnginfo
+        encode_and_write(img, filepath, "png", record, **save_kwargs)
 
-                if wf_extra_pnginfo is not None:
-                    pnginfo_json = {
-                        piexif.ImageIFD.Make - i: f"{k}:{json.dumps(v, separators=(',', ':'))}"
-                        for i, (k, v) in enumerate(wf_extra_pnginfo.items())
-                    }
+    def _save_webp_jpeg(self, img, filepath, output_format, quality, compression_profile, save_meta, record=None):
+        save_kwargs = encoder_kwargs(output_format, compression_profile, quality)
 
-                if wf_prompt is not None:
-                    prompt_json = {
-                        piexif.ImageIFD.Model: f"prompt:{json.dumps(wf_prompt, separators=(',', ':'))}"
-                    }
-            else:
-                if extra_pnginfo is not None:
-                    pnginfo_json = {
-                        piexif.ImageIFD.Make - i: f"{k}:{json.dumps(v, separators=(',', ':'))}"
-                        for i, (k, v) in enumerate(extra_pnginfo.items())
-                    }
-
-                if prompt is not None:
-                    prompt_json = {
-                        piexif.ImageIFD.Model: f"prompt:{json.dumps(prompt, separators=(',', ':'))}"
-                    }
-
-        exif_dict = {}
-
-        if pnginfo_json or prompt_json:
-            exif_dict["0th"] = pnginfo_json | prompt_json
-
-        if a111_params:
-            exif_dict["Exif"] = {
-                piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(
-                    a111_params,
-                    encoding="unicode"
-                )
-            }
+        # EXIF built up front and handed to Pillow: the file is written once
+        exif_bytes = save_meta.exif if save_meta else None
+        if exif_bytes:
+            save_kwargs["exif"] = exif_bytes
 
-        if exif_dict:
-            try:
-                exif_bytes = piexif.dump(exif_dict)
-
-                if output_format in ["jpg", "jpeg"]:
-                    MAX_EXIF_SIZE = 65535
-                    if len(exif_bytes) > MAX_EXIF_SIZE:
-                        print(f"⚠️ Métadonnées trop volumineuses ({len(exif_bytes)} bytes) pour JPEG (max {MAX_EXIF_SIZE})")
-                        exif_dict_minimal = {}
-                        if a111_params:
-                            exif_dict_minimal["Exif"] = {
-                                piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(
-                                    a111_params,
-                                    encoding="unicode"
-                                )
-                            }
-                        if exif_dict_minimal:
-                            exif_bytes = piexif.dump(exif_dict_minimal)
-                            if len(exif_bytes) <= MAX_EXIF_SIZE:
-                                piexif.insert(exif_bytes, filepath)
-                                print("   → Métadonnées A1111 sauvegardées (workflow omis)")
-                            else:
-                                print("   → Impossible de sauvegarder les métadonnées")
-                        return
-
-                piexif.insert(exif_bytes, filepath)
-            except Exception as e:
-                print(f"Could not save EXIF metadata: {e}")
+        encode_and_write(img, filepath, output_format, record, **save_kwargs)
 
 
 NODE_CLASS_MAPPINGS = {
@@ -1,7 +1,7 @@
 import os
-import torch
-import numpy as np
-from PIL import Image
+
+from .image_convert import uint8_to_image_tensor
+from .image_reader import read_image_pixels
 
 class TOOCropImage:
     """
@@ -103,18 +103,13 @@ class TOOCropImage:
         return (img_tensor[:, y1:y2, x1:x2, :],)
 
     def _load_image_from_path(self, path):
-        """Load image from path and convert to ComfyUI tensor"""
+        """Load image from path and convert to ComfyUI tensor (decoded pixels are cached)"""
         try:
-            img = Image.open(path)
-            img = img.convert("RGB")
-            img_array = np.array(img).astype(np.float32) / 255.0
-            img_tensor = torch.from_numpy(img_array)[None,]
-            return img_tensor
+            return uint8_to_image_tensor(read_image_pixels(path))
         except Exception as e:
             print(f"TOOCropImage: Error loading image '{path}': {e}")
             return None
 
-
 NODE_CLASS_MAPPINGS = {
     "TOOCropImage": TOOCropImage
 }
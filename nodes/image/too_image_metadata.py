@@ -1,7 +1,8 @@
-import hashlib
 import os
 import folder_paths
 
+from .model_hashes import file_autov3, file_sha256, get_hash_pool
+
 class TOOImageMetadata:
     """
     Node pour créer des métadonnées d'image au format Civitai (A1111).
@@ -51,6 +52,10 @@ class TOOImageMetadata:
                 "metadata": ("METADATA", {
                     "tooltip": "Métadonnées existantes à éditer"
                 }),
+                "trust_embedded_hashes": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Utiliser le hash AutoV3 déjà écrit dans le header safetensors des loras (sshs_model_hash, modelspec.hash_sha256) au lieu de relire tout le fichier. Confiance sur le format seulement : la valeur n'est PAS vérifiée contre le contenu du fichier (un hash périmé ou modifié est écrit tel quel dans les métadonnées)."
+                }),
             }
         }
 
@@ -60,7 +65,7 @@ class TOOImageMetadata:
     OUTPUT_NODE = False
     CATEGORY = "🔵TOO-Pack/image"
 
-    def create_metadata(self, positive, negative, seed, steps, cfg, sampler_name, scheduler, model="", loras="", custom="", metadata=None):
+    def create_metadata(self, positive, negative, seed, steps, cfg, sampler_name, scheduler, model="", loras="", custom="", metadata=None, trust_embedded_hashes=False):
         # Si metadata est fourni, partir de ces valeurs
         if metadata and isinstance(metadata, dict):
             model_name = metadata.get("model_name", "")
@@ -130,12 +135,18 @@ class TOOImageMetadata:
             # Réinitialiser lora_hashes si on fournit de nouvelles loras
             lora_hashes = {}
             
+            found = []
             for lora_path in lora_list:
                 full_path = self._get_lora_path(lora_path)
                 lora_name = os.path.splitext(os.path.basename(lora_path))[0]
                 if full_path and os.path.exists(full_path):
-                    lora_hash = self._calculate_lora_hash(full_path)
-                    lora_hashes[lora_name] = lora_hash
+                    found.append((lora_name, full_path))
+            
+            # Toutes les loras hashées en parallèle, ordre conservé
+            hashes = get_hash_pool().map(lambda path: self._calculate_lora_hash(path, trust_embedded_hashes),
+                                         [path for _, path in found])
+            for (lora_name, _), lora_hash in zip(found, hashes):
+                lora_hashes[lora_name] = lora_hash
 
         metadata_dict = {
             "model_name": model_name,
@@ -174,33 +185,20 @@ class TOOImageMetadata:
         return None
 
     def _calculate_sha256(self, filepath):
-        """Calcule le hash SHA256 d'un fichier"""
-        sha256_hash = hashlib.sha256()
+        """Calcule le hash SHA256 d'un fichier (index persistant, relu seulement si modifié)"""
         try:
-            with open(filepath, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            return file_sha256(filepath)
         except Exception as e:
             print(f"⚠️ Erreur calcul hash pour {filepath}: {e}")
             return ""
 
-    def _calculate_lora_hash(self, filepath):
-        """Calcule le hash SHA256 d'un lora en excluant les métadonnées safetensors (compatible A1111/Civitai AutoV3)"""
+    def _calculate_lora_hash(self, filepath, trust_embedded=False):
+        """
+        Calcule le hash SHA256 d'un lora en excluant les métadonnées safetensors (compatible A1111/Civitai AutoV3).
+        trust_embedded : reprendre le hash écrit dans le header s'il existe (format vérifié, valeur non vérifiée).
+        """
         try:
-            hash_sha256 = hashlib.sha256()
-            blksize = 1024 * 1024
-
-            with open(filepath, "rb") as f:
-                header = f.read(8)
-                n = int.from_bytes(header, "little")
-                offset = n + 8
-                f.seek(offset)
-
-                for chunk in iter(lambda: f.read(blksize), b""):
-                    hash_sha256.update(chunk)
-
-            return hash_sha256.hexdigest()[:12]
+            return file_autov3(filepath, trust_embedded)[:12]
         except Exception as e:
             print(f"⚠️ Erreur calcul hash lora pour {filepath}: {e}")
             return ""
@@ -0,0 +1,100 @@
+"""
+Index des nodes du workflow (extra_pnginfo["workflow"]) pour FileNaming._get_config.
+Le workflow est parsé et parcouru une seule fois (nodes, subgraphs embarqués,
+définitions de subgraphs) puis mis en cache : retrouver la config d'un node
+devient une recherche dans un dict.
+- workflow en chaîne JSON : clé = digest blake2b du texte (pas de re-parse)
+- workflow déjà en dict   : clé = identité de l'objet (même dict pour tous les
+  nodes d'une exécution ; le sérialiser pour le hasher coûterait autant que le parcours)
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+_CACHE_SIZE = 8
+# Garde-fou contre les définitions de subgraphs qui se référencent entre elles
+_MAX_DEPTH = 32
+
+
+def _embedded_subgraph(node):
+    return node.get("subgraph") or node.get("data", {}).get("subgraph")
+
+
+class WorkflowIndex:
+    """
+    by_path : "8742:8751" (chemin d'ids à travers les subgraphs) -> node
+    by_id   : dernier id seul -> premier node trouvé, dans l'ordre de l'ancien parcours
+    """
+
+    def __init__(self, workflow):
+        self.by_id = {}
+        self.by_path = {}
+        definitions = workflow.get("definitions", {}) or {}
+        subgraphs = [sg for sg in definitions.get("subgraphs", []) if isinstance(sg, dict)]
+        self._definitions = {sg.get("id"): sg for sg in subgraphs if sg.get("id")}
+
+        self._index_ids(workflow.get("nodes", []))
+        for sg in subgraphs:
+            self._index_ids(sg.get("nodes", []))
+        self._index_paths(workflow.get("nodes", []), "", 0)
+
+    def _index_ids(self, nodes):
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            self.by_id.setdefault(str(node.get("id", "")), node)
+            subgraph = _embedded_subgraph(node)
+            if subgraph:
+                self._index_ids(subgraph.get("nodes", []))
+
+    def _index_paths(self, nodes, prefix, depth):
+        if depth > _MAX_DEPTH:
+            return
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            path = f"{prefix}{node.get('id', '')}"
+            self.by_path.setdefault(path, node)
+            subgraph = _embedded_subgraph(node) or self._definitions.get(node.get("type"))
+            if subgraph:
+                self._index_paths(subgraph.get("nodes", []), path + ":", depth + 1)
+
+    def find(self, unique_id):
+        if unique_id is None:
+            return None
+        node = self.by_path.get(str(unique_id))
+        if node is None:
+            node = self.by_id.get(str(unique_id).rsplit(":", 1)[-1])  # '8742:8751' → '8751'
+        return node
+
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+def get_workflow_index(workflow):
+    """Index du workflow (dict ou JSON), construit une fois puis servi depuis le cache"""
+    if isinstance(workflow, str):
+        key = ("digest", hashlib.blake2b(workflow.encode("utf-8"), digest_size=16).hexdigest())
+        source = None
+    else:
+        key = ("id", id(workflow))
+        source = workflow
+
+    with _lock:
+        cached = _cache.get(key)
+        # Pour une clé d'identité, vérifier que c'est bien le même objet (id réutilisable)
+        if cached is not None and (source is None or cached[0] is source):
+            _cache.move_to_end(key)
+            return cached[1]
+
+    if source is None:
+        source = json.loads(workflow)
+    index = WorkflowIndex(source)
+
+    with _lock:
+        _cache[key] = (source if key[0] == "id" else None, index)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
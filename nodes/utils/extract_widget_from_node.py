@@ -1,5 +1,7 @@
 import json
 
+from .prompt_index import get_prompt_index
+
 
 class ExtractWidgetFromNode:
     @classmethod
@@ -73,13 +75,16 @@ class ExtractWidgetFromNode:
             elif not widget_list and value not in (None, ""):
                 out.append(str(value))
 
+        # Matching nodes from the per-execution prompt index (built once, shared with FileNaming)
+        index = get_prompt_index(prompt)
+        if is_node_id:
+            node_data = index.node(target_node_id)
+            matches = [node_data] if node_data is not None else []
+        else:
+            matches = [data for _, data in index.nodes_by_class(node_name)]
+
         result_lines = []
-        for node_id in prompt:
-            node_data = prompt[node_id]
-            class_type = node_data.get("class_type", "")
-            match = (str(node_id) == target_node_id) if is_node_id else (node_name.lower() in class_type.lower())
-            if not match:
-                continue
+        for node_data in matches:
             node_results = []
             for key, value in node_data.get("inputs", {}).items():
                 if isinstance(value, list):
@@ -0,0 +1,46 @@
+"""
+Per-execution index of the API-format prompt, shared by FileNaming and
+ExtractWidgetFromNode. The prompt dict is the same object for every node of
+one execution, so the index is built once (keyed on the prompt's identity)
+instead of scanning every node for each `ClassName:widget` token.
+"""
+import threading
+
+
+class PromptIndex:
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.size = len(prompt)
+        self.by_id = {}
+        self._nodes = []  # (node_id, class_type.lower(), node_data) in prompt order
+        self._class_matches = {}
+        for node_id, node_data in prompt.items():
+            if not isinstance(node_data, dict):
+                continue
+            self.by_id[str(node_id)] = node_data
+            self._nodes.append((node_id, str(node_data.get("class_type", "")).lower(), node_data))
+
+    def node(self, node_id):
+        return self.by_id.get(str(node_id))
+
+    def nodes_by_class(self, class_search):
+        """[(node_id, node_data)] whose class_type contains class_search (case-insensitive), memoized"""
+        class_search = class_search.lower()
+        matches = self._class_matches.get(class_search)
+        if matches is None:
+            matches = [(node_id, data) for node_id, class_lower, data in self._nodes if class_search in class_lower]
+            self._class_matches[class_search] = matches
+        return matches
+
+
+_lock = threading.Lock()
+_last = None
+
+
+def get_prompt_index(prompt):
+    """Index of this prompt, rebuilt only when a different prompt object comes in"""
+    global _last
+    with _lock:
+        if _last is None or _last.prompt is not prompt or _last.size != len(prompt):
+            _last = PromptIndex(prompt)
+        return _last
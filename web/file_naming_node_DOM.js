@@ -367,6 +367,11 @@ app.registerExtension({
                     output_format: "webp",
                     embed_workflow: true,
                     save_metadata: true,
+                    compress_workflow: false,
+                    compression_profile: "balanced",
+                    perf_log: "",
+                    dedup: "off",
+                    trust_embedded_hashes: false,
                     quality: 95,
                     output_folder: "",
                     prefix: "",
@@ -1131,6 +1136,58 @@ app.registerExtension({
                     qualityRow.appendChild(qualityInput);
                     content.appendChild(qualityRow);
 
+                    const profileRow = document.createElement('div');
+                    profileRow.className = 'fn-field-row';
+
+                    const profileLabel = document.createElement('div');
+                    profileLabel.className = 'fn-label';
+                    profileLabel.textContent = 'compression:';
+
+                    const profileSelect = document.createElement('select');
+                    profileSelect.className = 'fn-select';
+
+                    ['fast', 'balanced', 'smallest'].forEach(profile => {
+                        const option = document.createElement('option');
+                        option.value = profile;
+                        option.textContent = profile;
+                        if (profile === this.properties.compression_profile) option.selected = true;
+                        profileSelect.appendChild(option);
+                    });
+
+                    profileSelect.addEventListener('change', (e) => {
+                        this.properties.compression_profile = e.target.value;
+                    });
+
+                    profileRow.appendChild(profileLabel);
+                    profileRow.appendChild(profileSelect);
+                    content.appendChild(profileRow);
+
+                    const dedupRow = document.createElement('div');
+                    dedupRow.className = 'fn-field-row';
+
+                    const dedupLabel = document.createElement('div');
+                    dedupLabel.className = 'fn-label';
+                    dedupLabel.textContent = 'dedup:';
+
+                    const dedupSelect = document.createElement('select');
+                    dedupSelect.className = 'fn-select';
+
+                    ['off', 'reuse', 'hardlink'].forEach(mode => {
+                        const option = document.createElement('option');
+                        option.value = mode;
+                        option.textContent = mode;
+                        if (mode === this.properties.dedup) option.selected = true;
+                        dedupSelect.appendChild(option);
+                    });
+
+                    dedupSelect.addEventListener('change', (e) => {
+                        this.properties.dedup = e.target.value;
+                    });
+
+                    dedupRow.appendChild(dedupLabel);
+                    dedupRow.appendChild(dedupSelect);
+                    content.appendChild(dedupRow);
+
                     const metadataRow = document.createElement('div');
                     metadataRow.className = 'fn-field-row';
 
@@ -1171,6 +1228,65 @@ app.registerExtension({
                     workflowRow.appendChild(workflowToggle);
                     content.appendChild(workflowRow);
 
+                    const compressRow = document.createElement('div');
+                    compressRow.className = 'fn-field-row';
+
+                    const compressLabel = document.createElement('div');
+                    compressLabel.className = 'fn-label';
+                    compressLabel.textContent = 'compress workflow:';
+
+                    const compressToggle = document.createElement('button');
+                    compressToggle.className = 'fn-toggle' + (this.properties.compress_workflow ? '' : ' off');
+                    compressToggle.textContent = this.properties.compress_workflow ? 'ON' : 'OFF';
+                    compressToggle.addEventListener('click', () => {
+                        this.properties.compress_workflow = !this.properties.compress_workflow;
+                        compressToggle.textContent = this.properties.compress_workflow ? 'ON' : 'OFF';
+                        compressToggle.className = 'fn-toggle' + (this.properties.compress_workflow ? '' : ' off');
+                    });
+
+                    compressRow.appendChild(compressLabel);
+                    compressRow.appendChild(compressToggle);
+                    content.appendChild(compressRow);
+
+                    const trustRow = document.createElement('div');
+                    trustRow.className = 'fn-field-row';
+
+                    const trustLabel = document.createElement('div');
+                    trustLabel.className = 'fn-label';
+                    trustLabel.textContent = 'trust header hashes:';
+
+                    const trustToggle = document.createElement('button');
+                    trustToggle.className = 'fn-toggle' + (this.properties.trust_embedded_hashes ? '' : ' off');
+                    trustToggle.textContent = this.properties.trust_embedded_hashes ? 'ON' : 'OFF';
+                    trustToggle.addEventListener('click', () => {
+                        this.properties.trust_embedded_hashes = !this.properties.trust_embedded_hashes;
+                        trustToggle.textContent = this.properties.trust_embedded_hashes ? 'ON' : 'OFF';
+                        trustToggle.className = 'fn-toggle' + (this.properties.trust_embedded_hashes ? '' : ' off');
+                    });
+
+                    trustRow.appendChild(trustLabel);
+                    trustRow.appendChild(trustToggle);
+                    content.appendChild(trustRow);
+
+                    const perfLogRow = document.createElement('div');
+                    perfLogRow.className = 'fn-field-row';
+
+                    const perfLogLabel = document.createElement('div');
+                    perfLogLabel.className = 'fn-label';
+                    perfLogLabel.textContent = 'perf log:';
+
+                    const perfLogInput = document.createElement('input');
+                    perfLogInput.className = 'fn-input';
+                    perfLogInput.placeholder = 'timings.jsonl';
+                    perfLogInput.value = this.properties.perf_log || '';
+                    perfLogInput.addEventListener('input', (e) => {
+                        this.properties.perf_log = e.target.value;
+                    });
+
+                    perfLogRow.appendChild(perfLogLabel);
+                    perfLogRow.appendChild(perfLogInput);
+                    content.appendChild(perfLogRow);
+
                     return content;
                 });
 
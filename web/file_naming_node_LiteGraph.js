@@ -33,6 +33,11 @@ app.registerExtension({
                     output_format: "webp",
                     embed_workflow: true,
                     save_metadata: true,
+                    compress_workflow: false,
+                    compression_profile: "balanced",
+                    perf_log: "",
+                    dedup: "off",
+                    trust_embedded_hashes: false,
                     quality: 95,
                     output_folder: "",
                     prefix: "",
@@ -730,6 +735,14 @@ nodeType.prototype.startPicking = function(targetWidget) {
                         this.properties.quality = v;
                     }, { min: 1, max: 100, step: 1 });
 
+                    this.addWidget("combo", "compression", this.properties.compression_profile, (v) => {
+                        this.properties.compression_profile = v;
+                    }, { values: ["fast", "balanced", "smallest"] });
+
+                    this.addWidget("combo", "dedup", this.properties.dedup, (v) => {
+                        this.properties.dedup = v;
+                    }, { values: ["off", "reuse", "hardlink"] });
+
                     this.addWidget("toggle", "save metadata", this.properties.save_metadata, (v) => {
                         this.properties.save_metadata = v;
                     });
@@ -737,6 +750,18 @@ nodeType.prototype.startPicking = function(targetWidget) {
                     this.addWidget("toggle", "embed workflow", this.properties.embed_workflow, (v) => {
                         this.properties.embed_workflow = v;
                     });
+
+                    this.addWidget("toggle", "compress workflow", this.properties.compress_workflow, (v) => {
+                        this.properties.compress_workflow = v;
+                    });
+
+                    this.addWidget("toggle", "trust header hashes", this.properties.trust_embedded_hashes, (v) => {
+                        this.properties.trust_embedded_hashes = v;
+                    });
+
+                    this.addWidget("text", "perf log", this.properties.perf_log, (v) => {
+                        this.properties.perf_log = v;
+                    });
                 }
 
                 const currentWidth = this.size ? this.size[0] : 300;